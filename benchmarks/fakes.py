@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Offline stand-ins for the Discord API and the Gemini model used by the benchmarks.
+Only the attributes the cogs actually touch are implemented.
+"""
+import asyncio
+import contextlib
+import datetime
+import itertools
+import time
+from collections import Counter, defaultdict
+import discord
+
+_ids = itertools.count(1_000_000_000_000_000)
+
+def next_id():
+    """Return a fresh snowflake-like ID."""
+    return next(_ids)
+
+class FakeDiscordAPI:
+    """Simulated Discord HTTP layer with fixed latency and per-route concurrency buckets.
+
+    `global_concurrency` optionally caps requests in flight across all routes,
+    standing in for Discord's global rate limit. When `bot` is set, state
+    changes are echoed back as gateway events.
+    """
+
+    def __init__(self, latency, bucket_concurrency, global_concurrency=None):
+        self.latency = latency
+        self.bucket_concurrency = bucket_concurrency
+        self.bot = None
+        self.calls = Counter()
+        self._buckets = defaultdict(lambda: asyncio.Semaphore(self.bucket_concurrency))
+        self._global = asyncio.Semaphore(global_concurrency) if global_concurrency else contextlib.nullcontext()
+
+    async def request(self, route, bucket):
+        """Wait for the route's bucket, then for the simulated round trip."""
+        self.calls[route] += 1
+        async with self._buckets[(route, bucket)]:
+            async with self._global:
+                await asyncio.sleep(self.latency)
+
+class FakeMessage:
+    """Message that can be edited and deleted through the fake API."""
+
+    def __init__(self, api, channel, content=None, created_at=None):
+        self.api = api
+        self.channel = channel
+        self.id = next_id()
+        self.content = content
+        self.created_at = created_at or discord.utils.utcnow()
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        await self.api.request('edit_message', self.channel.id)
+        self.content = content
+
+    async def delete(self):
+        await self.api.request('delete_message', self.channel.id)
+        self.channel.messages.remove(self)
+
+class FakePermissions:
+    """Permission set that allows everything."""
+
+    def __getattr__(self, name):
+        return True
+
+class FakeTextChannel:
+    """Text channel with an in-memory message history."""
+
+    def __init__(self, api, guild, message_count=0, old_message_count=0):
+        self.api = api
+        self.guild = guild
+        self.id = next_id()
+        self.name = f"bench-{self.id}"
+        self.position = 0
+        now = discord.utils.utcnow()
+        old = now - datetime.timedelta(days=30)
+        # Oldest first, matching the order messages were posted
+        self.messages = [FakeMessage(api, self, "old", old) for _ in range(old_message_count)]
+        self.messages += [FakeMessage(api, self, "recent", now) for _ in range(message_count)]
+
+    def permissions_for(self, member):
+        return FakePermissions()
+
+    async def send(self, content=None, embed=None, **kwargs):
+        await self.api.request('send_message', self.id)
+        message = FakeMessage(self.api, self, content)
+        self.messages.append(message)
+        return message
+
+    async def history(self, limit=None):
+        for message in list(reversed(self.messages))[:limit]:
+            yield message
+
+    async def delete_messages(self, messages):
+        await self.api.request('bulk_delete', self.id)
+        deleted = set(id(message) for message in messages)
+        self.messages = [message for message in self.messages if id(message) not in deleted]
+
+class FakeVoiceState:
+    def __init__(self, channel, mute=False):
+        self.channel = channel
+        self.mute = mute
+
+class FakeMember:
+    """Guild member whose voice mute state can be edited through the fake API."""
+
+    def __init__(self, api, guild, top_role=1, voice_channel=None):
+        self.api = api
+        self.guild = guild
+        self.id = next_id()
+        self.name = f"member{self.id % 100000}"
+        self.top_role = top_role
+        self.guild_permissions = FakePermissions()
+        self.voice = FakeVoiceState(voice_channel) if voice_channel else None
+
+    async def edit(self, mute=None, **kwargs):
+        await self.api.request('edit_member', self.guild.id)
+        if mute is not None and self.voice:
+            before = FakeVoiceState(self.voice.channel, self.voice.mute)
+            self.voice.mute = mute
+            if self.api.bot is not None:
+                self.api.bot.dispatch('voice_state_update', self, before, self.voice)
+
+class FakeVoiceChannel(discord.VoiceChannel):
+    """Voice channel that passes the cogs' isinstance checks without a gateway."""
+
+    def __init__(self, guild, channel_id):
+        self.guild = guild
+        self.id = channel_id
+        self.name = f"voice-{channel_id}"
+        self.fake_members = []
+
+    @property
+    def members(self):
+        return self.fake_members
+
+    @property
+    def voice_states(self):
+        return {member.id: member.voice for member in self.fake_members}
+
+class FakeGuild:
+    """Guild with a configurable number of members and one populated voice channel."""
+
+    def __init__(self, api, member_count, voice_channel_id, voice_member_count):
+        self.api = api
+        self.id = next_id()
+        self.me = FakeMember(api, self, top_role=100)
+        self.voice_channel = FakeVoiceChannel(self, voice_channel_id)
+        self.voice_channels = [self.voice_channel]
+        self.stage_channels = []
+        self.members = [FakeMember(api, self) for _ in range(member_count)]
+        for member in self.members[:voice_member_count]:
+            member.voice = FakeVoiceState(self.voice_channel)
+            self.voice_channel.fake_members.append(member)
+        self._members_by_id = {member.id: member for member in self.members}
+        self._channels = {voice_channel_id: self.voice_channel}
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_member(self, member_id):
+        return self._members_by_id.get(member_id)
+
+class FakeContext:
+    """Command context that sends through the fake API."""
+
+    def __init__(self, bot, guild, channel, author, command):
+        self.bot = bot
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.command = command
+
+    async def send(self, content=None, embed=None, **kwargs):
+        return await self.channel.send(content, embed=embed, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def typing(self):
+        await self.channel.api.request('typing', self.channel.id)
+        yield
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+class FakeResponse:
+    """Complete or streamed response chunk with text and usage metadata."""
+
+    def __init__(self, text, prompt_tokens=0, output_tokens=0):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt_tokens, output_tokens)
+
+class FakeStream:
+    """Async iterable of response chunks produced at a fixed rate."""
+
+    def __init__(self, chunks, chunk_delay):
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+class FakeTokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+class FakeGeminiModel:
+    """Gemini model replacement with configurable latency.
+
+    With `blocking=True` the latency is spent in time.sleep, reproducing the
+    original synchronous client so its effect on the event loop can be measured.
+    """
+
+    latency = 0.5
+    reply_length = 400
+    chunk_count = 8
+    blocking = False
+    calls = 0
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    @classmethod
+    def configure(cls, latency, reply_length, chunk_count, blocking):
+        cls.latency = latency
+        cls.reply_length = reply_length
+        cls.chunk_count = chunk_count
+        cls.blocking = blocking
+        cls.calls = 0
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False, **kwargs):
+        type(self).calls += 1
+        prompt_tokens = sum(len(str(part)) for content in contents for part in content["parts"]) if isinstance(contents, list) else len(str(contents))
+        text = "あ" * self.reply_length
+        if stream:
+            # Time to first chunk is a fifth of the total latency
+            await self._wait(self.latency / 5)
+            size = max(len(text) // self.chunk_count, 1)
+            pieces = [text[i:i + size] for i in range(0, len(text), size)]
+            chunks = [FakeResponse(piece) for piece in pieces[:-1]]
+            chunks.append(FakeResponse(pieces[-1], prompt_tokens, len(text)))
+            return FakeStream(chunks, self.latency * 4 / 5 / len(chunks))
+        await self._wait(self.latency)
+        return FakeResponse(text, prompt_tokens, len(text))
+
+    async def count_tokens_async(self, contents, **kwargs):
+        await self._wait(0.01)
+        return FakeTokenCount(len(str(contents)))
+
+    async def _wait(self, seconds):
+        if self.blocking:
+            time.sleep(seconds)
+        else:
+            await asyncio.sleep(seconds)
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark harness for the bot's cogs.
+
+Loads the real cogs into a bot that never connects to Discord, replaces the
+Discord HTTP layer and the Gemini model with the fakes in benchmarks/fakes.py,
+and drives synthetic command load. Reports throughput, latency percentiles and
+how long the event loop was blocked.
+
+Usage (from the repository root):
+    python -m benchmarks.run gemini --users 50 --requests 4 --gemini-latency 0.8
+    python -m benchmarks.run gemini --gemini-blocking   # reproduce a blocking client
+    python -m benchmarks.run mute --voice-size 40 --api-latency 0.05
+    python -m benchmarks.run nuke --messages 2000 --old-messages 50
+    python -m benchmarks.run utility --users 100
+    python -m benchmarks.run mixed --users 30 --global-concurrency 10   # moderation under AI load
+"""
+import argparse
+import asyncio
+import logging
+import time
+import discord
+from discord.ext import commands
+import google.generativeai as genai
+import config
+from utils import metrics
+from utils.logging_setup import setup_logging
+from utils.scheduler import CommandScheduler, PriorityGate, install_outbound_priority
+from benchmarks.fakes import FakeContext, FakeDiscordAPI, FakeGeminiModel, FakeGuild, FakeMember, FakeTextChannel
+
+logger = logging.getLogger('discord_bot')
+
+EXTENSIONS = ("cogs.ai_commands", "cogs.moderation_commands", "cogs.utility_commands")
+
+class BenchBot(commands.Bot):
+    """Bot that reports a fixed gateway latency since it never connects."""
+
+    @property
+    def latency(self):
+        return 0.05
+
+class LoopMonitor:
+    """Sample event loop lag to measure how long the loop was blocked."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - start - self.interval, 0))
+
+class ErrorCounter(logging.Handler):
+    """Count error records logged by the cogs during a run."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of `values`."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+async def timed(latencies, coro):
+    start = time.perf_counter()
+    await coro
+    latencies.append(time.perf_counter() - start)
+
+async def run_gemini(bot, api, guild, args):
+    """Concurrent users each asking `requests` questions."""
+    command = bot.get_command('gemini')
+    latencies = []
+
+    async def user(index):
+        channel = FakeTextChannel(api, guild)
+        author = FakeMember(api, guild)
+        for request in range(args.requests):
+            # --distinct limits how many different questions exist, exercising the cache
+            question = f"質問 {(index * args.requests + request) % args.distinct}"
+            ctx = FakeContext(bot, guild, channel, author, command)
+            await timed(latencies, command(ctx, message=question))
+
+    await asyncio.gather(*(user(i) for i in range(args.users)))
+    return latencies
+
+async def run_mute(bot, api, guild, args):
+    """Alternate bulk mute and unmute of the populated voice channel."""
+    mute_all = bot.get_command('暑くないわ')
+    unmute_all = bot.get_command('解除')
+    channel = FakeTextChannel(api, guild)
+    latencies = []
+    for _ in range(args.requests):
+        for command in (mute_all, unmute_all):
+            ctx = FakeContext(bot, guild, channel, guild.me, command)
+            await timed(latencies, command(ctx))
+    return latencies
+
+async def run_nuke(bot, api, guild, args):
+    """Nuke channels pre-filled with recent and old messages, one per user."""
+    command = bot.get_command('nuke')
+    latencies = []
+
+    async def user():
+        channel = FakeTextChannel(api, guild, args.messages, args.old_messages)
+        ctx = FakeContext(bot, guild, channel, guild.me, command)
+        await timed(latencies, command(ctx))
+
+    await asyncio.gather(*(user() for _ in range(args.users)))
+    return latencies
+
+async def run_utility(bot, api, guild, args):
+    """Concurrent ping and time commands."""
+    commands_to_run = (bot.get_command('ping'), bot.get_command('time'))
+    latencies = []
+
+    async def user():
+        channel = FakeTextChannel(api, guild)
+        author = FakeMember(api, guild)
+        for _ in range(args.requests):
+            for command in commands_to_run:
+                ctx = FakeContext(bot, guild, channel, author, command)
+                await timed(latencies, command(ctx))
+
+    await asyncio.gather(*(user() for _ in range(args.users)))
+    return latencies
+
+async def run_mixed(bot, api, guild, args):
+    """Bulk mute and unmute while users flood !gemini; reports the moderation latency only.
+
+    Commands go through the priority scheduler as they would in main.py,
+    unless --no-priority is given.
+    """
+    scheduler = CommandScheduler(
+        config.COMMAND_PRIORITY_CLASSES, config.COMMAND_DEFAULT_PRIORITY_CLASS, config.COMMAND_POOL_SIZES
+    )
+    if not args.no_priority:
+        install_outbound_priority(api, PriorityGate(
+            config.COMMAND_PRIORITY_ORDER, config.OUTBOUND_REQUEST_LIMITS, config.OUTBOUND_MAX_PRIORITY_WAIT
+        ))
+
+    async def invoke(command, ctx, **kwargs):
+        if args.no_priority:
+            return await command(ctx, **kwargs)
+        await scheduler.acquire(ctx)
+        try:
+            await command(ctx, **kwargs)
+        finally:
+            scheduler.release(ctx)
+
+    gemini = bot.get_command('gemini')
+    # AI users finish their current request and stop once this is set
+    done = asyncio.Event()
+
+    async def ai_user(index):
+        channel = FakeTextChannel(api, guild)
+        author = FakeMember(api, guild)
+        request = 0
+        while not done.is_set():
+            ctx = FakeContext(bot, guild, channel, author, gemini)
+            await invoke(gemini, ctx, message=f"質問 {index} {request}")
+            request += 1
+
+    ai_load = [asyncio.create_task(ai_user(i)) for i in range(args.users)]
+    # Let the AI backlog build up before moderators act
+    await asyncio.sleep(args.gemini_latency)
+    latencies = []
+    channel = FakeTextChannel(api, guild)
+    try:
+        for _ in range(args.requests):
+            for command in (bot.get_command('暑くないわ'), bot.get_command('解除')):
+                ctx = FakeContext(bot, guild, channel, guild.me, command)
+                await timed(latencies, invoke(command, ctx))
+    finally:
+        done.set()
+        await asyncio.gather(*ai_load, return_exceptions=True)
+    return latencies
+
+SCENARIOS = {
+    "gemini": run_gemini,
+    "mute": run_mute,
+    "nuke": run_nuke,
+    "utility": run_utility,
+    "mixed": run_mixed
+}
+
+def install_fake_gemini(args):
+    """Make the AI cog build FakeGeminiModel instances instead of real models."""
+    FakeGeminiModel.configure(args.gemini_latency, args.reply_length, args.chunks, args.gemini_blocking)
+    genai.GenerativeModel = FakeGeminiModel
+
+async def benchmark(args):
+    install_fake_gemini(args)
+    config.RESPONSE_CACHE_DB_PATH = None
+    config.AUDIT_DB_PATH = ':memory:'
+    if not args.rate_limits:
+        # Measure raw throughput; the per-user and per-guild limits would reject most commands
+        config.GEMINI_USER_BURST = config.GEMINI_GUILD_BURST = 10 ** 9
+        config.GEMINI_QUEUE_MAX = config.GEMINI_QUEUE_MAX_PER_USER = 10 ** 9
+    api = FakeDiscordAPI(args.api_latency, args.bucket_concurrency, args.global_concurrency)
+
+    bot = BenchBot(command_prefix=config.BOT_PREFIX, intents=discord.Intents.default(), help_command=None)
+    api.bot = bot
+    async with bot:
+        for extension in EXTENSIONS:
+            await bot.load_extension(extension)
+        guild = FakeGuild(api, args.guild_size, config.VOICE_CHANNEL_ID, args.voice_size)
+
+        errors = ErrorCounter()
+        logger.addHandler(errors)
+        monitor = LoopMonitor()
+        monitor.start()
+        start = time.perf_counter()
+        try:
+            latencies = await SCENARIOS[args.scenario](bot, api, guild, args)
+        finally:
+            elapsed = time.perf_counter() - start
+            monitor.stop()
+            logger.removeHandler(errors)
+
+    blocked = [lag for lag in monitor.samples if lag > args.block_threshold]
+    print(f"scenario:          {args.scenario}")
+    print(f"commands:          {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f}/s)")
+    print(f"latency p50:       {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"latency p95:       {percentile(latencies, 0.95) * 1000:.1f} ms")
+    print(f"latency p99:       {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"latency max:       {max(latencies, default=0) * 1000:.1f} ms")
+    print(f"loop lag max:      {max(monitor.samples, default=0) * 1000:.1f} ms")
+    print(f"loop blocked time: {sum(blocked) * 1000:.1f} ms over {len(blocked)} stalls > {args.block_threshold * 1000:.0f} ms")
+    print(f"errors logged:     {errors.count}")
+    print(f"gemini calls:      {FakeGeminiModel.calls}")
+    if args.scenario == 'gemini':
+        print(f"gemini admissions: {metrics.GEMINI_ADMISSIONS.totals()}")
+    print(f"discord calls:     {dict(api.calls)}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the bot's cogs")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--users", type=int, default=20, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=5, help="commands per user")
+    parser.add_argument("--distinct", type=int, default=10 ** 9, help="number of distinct Gemini questions")
+    parser.add_argument("--guild-size", type=int, default=1000, help="members in the fake guild")
+    parser.add_argument("--voice-size", type=int, default=30, help="members in the voice channel")
+    parser.add_argument("--messages", type=int, default=500, help="recent messages per nuked channel")
+    parser.add_argument("--old-messages", type=int, default=0, help="messages older than the bulk delete window")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per fake Discord API call")
+    parser.add_argument("--bucket-concurrency", type=int, default=5, help="parallel calls allowed per route bucket")
+    parser.add_argument("--global-concurrency", type=int, default=None, help="parallel calls allowed across all routes")
+    parser.add_argument("--no-priority", action="store_true", help="mixed: bypass the priority scheduler")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    parser.add_argument("--gemini-blocking", action="store_true", help="spend Gemini latency in time.sleep")
+    parser.add_argument("--reply-length", type=int, default=400, help="characters per Gemini reply")
+    parser.add_argument("--chunks", type=int, default=8, help="chunks per streamed Gemini reply")
+    parser.add_argument("--rate-limits", action="store_true", help="apply the configured !gemini rate limits and queue bounds")
+    parser.add_argument("--block-threshold", type=float, default=0.05, help="loop lag counted as blocking (seconds)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    # Log through the same background pipeline as the bot, in plain text; keep the report readable
+    setup_logging(logging.WARNING, json_format=False)
+    asyncio.run(benchmark(parse_args()))
@@ -3,56 +3,344 @@
 AI-related commands for the Discord bot using Google's Gemini API.
 """
 import discord
+from discord import app_commands
 from discord.ext import commands
-import google.generativeai as genai
+import asyncio
 import traceback
 import sys
 import logging
 from utils.error_handler import handle_command_error
+from utils.gemini_client import GeminiClient
+from utils.resilience import CircuitOpenError
+from utils.streaming_reply import StreamingReply
+from utils.reply_renderer import render_reply
+from utils.response_cache import ResponseCache, make_cache_key
+from utils.singleflight import SingleFlight
+from utils.admission import FairQueue, QueueFullError, RateLimiter
+from utils.conversation import ConversationStore
+from utils import metrics
+from utils.shared_state import shared_db_path
+from utils.periodic import periodic_scheduler
 import config
 
 logger = logging.getLogger('discord_bot')
 
+def load_system_instruction():
+    """Return the system prompt, followed by the preamble file if one is configured."""
+    if not config.GEMINI_PREAMBLE_PATH:
+        return config.SYSTEM_PROMPT
+    try:
+        with open(config.GEMINI_PREAMBLE_PATH, encoding='utf-8') as preamble:
+            return f"{config.SYSTEM_PROMPT}\n\n{preamble.read()}"
+    except OSError as e:
+        logger.error(f"Could not read the Gemini preamble {config.GEMINI_PREAMBLE_PATH}: {str(e)}")
+        return config.SYSTEM_PROMPT
+
 class AICommands(commands.Cog):
     """Commands that interact with AI services."""
     
     def __init__(self, bot):
         self.bot = bot
-        self.model = genai.GenerativeModel(config.GEMINI_MODEL)
+        self.system_instruction = load_system_instruction()
+        # Context caching only pays off (and is only accepted) for long instructions
+        use_context_cache = config.GEMINI_CONTEXT_CACHE_ENABLED and config.GEMINI_PREAMBLE_PATH
+        self.client = GeminiClient(
+            config.GEMINI_MODEL,
+            max_concurrency=config.GEMINI_MAX_CONCURRENCY,
+            timeout=config.GEMINI_REQUEST_TIMEOUT,
+            attempt_timeout=config.GEMINI_ATTEMPT_TIMEOUT,
+            fallback_model_name=config.GEMINI_FALLBACK_MODEL,
+            max_retries=config.GEMINI_MAX_RETRIES,
+            retry_base_delay=config.GEMINI_RETRY_BASE_DELAY,
+            retry_max_delay=config.GEMINI_RETRY_MAX_DELAY,
+            hedge_percentile=config.GEMINI_HEDGE_PERCENTILE,
+            hedge_min_samples=config.GEMINI_HEDGE_MIN_SAMPLES,
+            breaker_failure_threshold=config.GEMINI_BREAKER_FAILURE_THRESHOLD,
+            breaker_reset_timeout=config.GEMINI_BREAKER_RESET_TIMEOUT,
+            system_instruction=self.system_instruction,
+            context_cache_ttl=config.GEMINI_CONTEXT_CACHE_TTL if use_context_cache else None
+        )
+        self.cache = None
+        if config.RESPONSE_CACHE_ENABLED:
+            self.cache = ResponseCache(
+                max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+                ttl=config.RESPONSE_CACHE_TTL,
+                db_path=shared_db_path('response_cache.db', config.RESPONSE_CACHE_DB_PATH)
+            )
+        # Identical questions asked at the same time share one upstream call
+        self.inflight = SingleFlight()
+        # Admission control: rate limits per user and guild, fair dispatch across users
+        self.user_limiter = RateLimiter(config.GEMINI_USER_BURST, config.GEMINI_USER_REFILL_PER_MINUTE / 60)
+        self.guild_limiter = RateLimiter(config.GEMINI_GUILD_BURST, config.GEMINI_GUILD_REFILL_PER_MINUTE / 60)
+        self.queue = FairQueue(
+            concurrency=config.GEMINI_MAX_CONCURRENCY,
+            max_queued=config.GEMINI_QUEUE_MAX,
+            max_queued_per_user=config.GEMINI_QUEUE_MAX_PER_USER
+        )
+        metrics.GEMINI_QUEUE_DEPTH.set_function(lambda: len(self.queue))
+        self.conversations = None
+        if config.CONVERSATION_MEMORY_ENABLED:
+            self.conversations = ConversationStore(
+                token_budget=config.CONVERSATION_TOKEN_BUDGET,
+                idle_timeout=config.CONVERSATION_IDLE_TIMEOUT,
+                max_total_chars=config.CONVERSATION_MAX_TOTAL_CHARS
+            )
+    
+    async def cog_load(self):
+        """Import the Gemini SDK up front unless it should be loaded lazily."""
+        periodic_scheduler.add('ai-maintenance', config.AI_MAINTENANCE_INTERVAL, self.evict_stale_state)
+        if self.client.context_cache is not None:
+            periodic_scheduler.add(
+                'gemini-context-cache', config.GEMINI_CONTEXT_CACHE_TTL / 2, self.client.refresh_context_cache
+            )
+        if not config.GEMINI_LAZY_IMPORT:
+            await self.client.load()
+    
+    def cog_unload(self):
+        """Cleanup when cog is unloaded."""
+        periodic_scheduler.remove('ai-maintenance')
+        periodic_scheduler.remove('gemini-context-cache')
+        if self.cache is not None:
+            self.cache.close()
+    
+    def evict_stale_state(self):
+        """Drop expired cache entries, idle conversations and refilled rate-limit buckets."""
+        expired = self.cache.evict_expired() if self.cache is not None else 0
+        idle = self.conversations.evict_idle() if self.conversations is not None else 0
+        buckets = self.user_limiter.prune() + self.guild_limiter.prune()
+        if expired or idle:
+            logger.info(f"Evicted {expired} cached responses, {idle} idle conversations and {buckets} rate-limit buckets")
     
-    @commands.command(name='gemini', help="Gemini AIを使って質問に答えます。例: !gemini こんにちは")
+    @commands.hybrid_command(name='gemini', help="Gemini AIを使って質問に答えます。例: !gemini こんにちは", extras={'defer': True})
+    @app_commands.describe(message="Geminiへの質問（先頭に --nocache を付けるとキャッシュを使いません）")
     async def gemini_chat(self, ctx, *, message):
         """Send a message to Gemini AI and get a response."""
+        bypass_cache = message.startswith(config.RESPONSE_CACHE_OPT_OUT_FLAG)
+        if bypass_cache:
+            message = message[len(config.RESPONSE_CACHE_OPT_OUT_FLAG):].strip()
+            if not message:
+                await ctx.send("質問を入力してください。")
+                return
+        # Answers that depend on conversation history are neither cached nor shared
+        conversation_key = self.conversation_key(ctx)
+        remember = self.conversations is not None and self.conversations.is_enabled(conversation_key)
+        history = self.conversations.history(conversation_key) if remember else []
+        use_cache = self.cache is not None and not bypass_cache and not remember
+        coalesce = config.GEMINI_COALESCE_REQUESTS and not bypass_cache and not remember
+
+        # The system prompt is bound to the model as its system instruction
+        contents = [
+            *history,
+            {"role": "user", "parts": [message]}
+        ]
+        generation_config = {
+            "max_output_tokens": config.MAX_OUTPUT_TOKENS,
+            "temperature": config.TEMPERATURE
+        }
+        cache_key = make_cache_key(
+            message,
+            model=config.GEMINI_MODEL,
+            system_prompt=self.system_instruction,
+            **generation_config
+        )
         try:
-            # Send typing indicator while processing
-            async with ctx.typing():
-                # Send message to Gemini API
-                response = self.model.generate_content(
-                    [
-                        {"role": "model", "parts": [config.SYSTEM_PROMPT]},
-                        {"role": "user", "parts": [message]}
-                    ],
-                    generation_config={
-                        "max_output_tokens": config.MAX_OUTPUT_TOKENS,
-                        "temperature": config.TEMPERATURE
-                    }
+            # Serve repeated questions from the cache
+            if use_cache:
+                reply = await self.cache.get(cache_key)
+                metrics.CACHE_LOOKUPS.inc(result='miss' if reply is None else 'hit')
+                if reply is not None:
+                    await self.send_reply(ctx, reply)
+                    return
+
+            # Only requests that reach the upstream count against the rate limits
+            retry_after = self.check_rate_limits(ctx)
+            if retry_after:
+                await ctx.send(f"リクエストが多すぎます。{retry_after:.0f}秒後に再度お試しください。")
+                return
+
+            if coalesce:
+                reply, shared = await self.inflight.do(
+                    cache_key,
+                    lambda: self.run_queued(ctx, lambda: self.generate_reply(ctx, contents, generation_config))
                 )
-                
-                # Send response to Discord (handle character limit)
-                reply = response.text
-                if len(reply) > config.MAX_MESSAGE_LENGTH:
-                    for i in range(0, len(reply), config.MAX_MESSAGE_LENGTH):
-                        await ctx.send(reply[i:i+config.MAX_MESSAGE_LENGTH])
-                else:
-                    await ctx.send(reply)
+                if shared:
+                    await self.send_reply(ctx, reply)
+                    return
+            else:
+                reply = await self.run_queued(ctx, lambda: self.generate_reply(ctx, contents, generation_config))
+
+            if use_cache and reply:
+                await self.cache.set(cache_key, reply)
+            if remember and reply:
+                await self.remember_exchange(conversation_key, message, reply, getattr(ctx, 'gemini_usage', None))
+        except asyncio.TimeoutError:
+            logger.warning(f"Gemini request timed out after {config.GEMINI_REQUEST_TIMEOUT}s")
+            await ctx.send("Gemini APIの応答がタイムアウトしました。しばらくしてから再度お試しください。")
+        except QueueFullError:
+            logger.warning(f"Gemini request shed: {len(self.queue)} requests already queued")
+            await ctx.send("現在混み合っています。しばらくしてから再度お試しください。")
+        except CircuitOpenError:
+            logger.warning("Gemini request rejected: all circuit breakers are open")
+            await ctx.send("Gemini APIが一時的に利用できません。しばらくしてから再度お試しください。")
         except Exception as e:
             await handle_command_error(ctx, e, "Gemini APIでエラーが発生しました")
     
+    @commands.hybrid_command(name='会話', aliases=['conversation'], help="Geminiの会話履歴を有効/無効にします。例: !会話 on / !会話 off / !会話 clear")
+    @app_commands.describe(mode="on / off / clear（省略時は現在の状態を表示）")
+    async def conversation_memory(self, ctx, mode=None):
+        """Enable, disable or clear conversation memory for this channel (or user)."""
+        if self.conversations is None:
+            await ctx.send("会話履歴機能は無効になっています。")
+            return
+
+        key = self.conversation_key(ctx)
+        if mode == 'on':
+            self.conversations.enable(key)
+            await ctx.send("会話履歴を有効にしました。続けて質問すると前の会話を踏まえて答えます。")
+        elif mode == 'off':
+            self.conversations.disable(key)
+            await ctx.send("会話履歴を無効にしました。")
+        elif mode == 'clear':
+            self.conversations.clear(key)
+            await ctx.send("会話履歴を消去しました。")
+        else:
+            state = "有効" if self.conversations.is_enabled(key) else "無効"
+            await ctx.send(f"会話履歴は現在{state}です。`!会話 on` / `!会話 off` / `!会話 clear` で切り替えられます。")
+    
+    def check_rate_limits(self, ctx):
+        """Spend a token from the user's and guild's buckets.
+
+        Returns 0 if the request is admitted, otherwise the seconds to wait.
+        """
+        guild_id = ctx.guild.id if ctx.guild else None
+        retry_after = self.user_limiter.retry_after(ctx.author.id)
+        if retry_after:
+            metrics.GEMINI_ADMISSIONS.inc(result='user_rate_limited')
+            return retry_after
+        if guild_id is not None:
+            retry_after = self.guild_limiter.retry_after(guild_id)
+            if retry_after:
+                metrics.GEMINI_ADMISSIONS.inc(result='guild_rate_limited')
+                return retry_after
+            self.guild_limiter.consume(guild_id)
+        self.user_limiter.consume(ctx.author.id)
+        return 0
+
+    async def run_queued(self, ctx, func):
+        """Run `func()` through the fair queue, telling the user where they are in line."""
+        notice = None
+        queued = False
+
+        async def on_queued(position):
+            nonlocal notice, queued
+            queued = True
+            try:
+                notice = await ctx.send(f"混み合っています。順番待ち: {position}番目")
+            except discord.HTTPException:
+                pass
+
+        async def start():
+            metrics.GEMINI_ADMISSIONS.inc(result='queued' if queued else 'admitted')
+            if notice is not None:
+                try:
+                    await notice.delete()
+                except discord.HTTPException:
+                    pass
+            return await func()
+
+        try:
+            return await self.queue.run(ctx.author.id, start, on_queued)
+        except QueueFullError:
+            metrics.GEMINI_ADMISSIONS.inc(result='shed')
+            raise
+
+    def conversation_key(self, ctx):
+        """Return the conversation history key for the invoking channel (and user)."""
+        if config.CONVERSATION_SCOPE == 'user':
+            return (ctx.channel.id, ctx.author.id)
+        return (ctx.channel.id,)
+    
+    async def remember_exchange(self, key, message, reply, usage=None):
+        """Count the tokens of a finished exchange and add it to the history.
+
+        The reply's token count comes from the response's `usage` metadata;
+        only the user's message needs a count_tokens call.
+        """
+        # Fall back to rough estimates if token counts are unavailable
+        model_tokens = getattr(usage, 'candidates_token_count', 0) or len(reply)
+        try:
+            user_tokens = await self.client.count_tokens(message)
+        except Exception as e:
+            logger.warning(f"Token counting failed: {str(e)}")
+            user_tokens = len(message)
+        self.conversations.add_exchange(key, message, user_tokens, reply, model_tokens)
+    
+    async def generate_reply(self, ctx, contents, generation_config):
+        """Get a response from Gemini, deliver it to the channel and return its text.
+
+        The response's usage metadata is left on `ctx.gemini_usage`.
+        """
+        if config.GEMINI_STREAMING:
+            return await self.stream_reply(ctx, contents, generation_config)
+
+        # Send typing indicator while processing
+        async with ctx.typing():
+            # Send message to Gemini API without blocking the event loop
+            reply = await self.client.generate(
+                contents, generation_config=generation_config, on_usage=lambda usage: setattr(ctx, 'gemini_usage', usage)
+            )
+            await self.send_reply(ctx, reply)
+        return reply
+    
+    async def send_reply(self, ctx, reply):
+        """Send a complete reply in as few messages as possible."""
+        if not reply:
+            await ctx.send("Geminiから応答がありませんでした。")
+            return
+        payloads = render_reply(
+            reply,
+            message_limit=config.MAX_MESSAGE_LENGTH,
+            embed_limit=config.REPLY_EMBED_LIMIT,
+            embed_total_limit=config.REPLY_EMBED_TOTAL_LIMIT,
+            attachment_threshold=config.REPLY_ATTACHMENT_THRESHOLD,
+            preview_length=config.REPLY_PREVIEW_LENGTH,
+            color=config.REPLY_EMBED_COLOR
+        )
+        for payload in payloads:
+            await ctx.send(**payload)
+    
+    async def stream_reply(self, ctx, contents, generation_config):
+        """Stream a Gemini response into a progressively edited message and return its full text."""
+        reply = StreamingReply(
+            ctx,
+            placeholder=config.STREAM_PLACEHOLDER,
+            max_length=config.REPLY_EMBED_LIMIT,
+            edit_interval=config.STREAM_EDIT_INTERVAL,
+            edit_min_chars=config.STREAM_EDIT_MIN_CHARS,
+            message_length=config.MAX_MESSAGE_LENGTH,
+            color=config.REPLY_EMBED_COLOR
+        )
+        await reply.start()
+        parts = []
+        stream = self.client.stream(
+            contents, generation_config=generation_config, on_usage=lambda usage: setattr(ctx, 'gemini_usage', usage)
+        )
+        async for text in stream:
+            parts.append(text)
+            await reply.append(text)
+        await reply.finish("Geminiから応答がありませんでした。")
+        return ''.join(parts)
+    
     @gemini_chat.error
     async def gemini_chat_error(self, ctx, error):
         """Error handler for gemini command."""
         await handle_command_error(ctx, error, "Gemini AIでエラーが発生しました")
 
+    @conversation_memory.error
+    async def conversation_memory_error(self, ctx, error):
+        """Error handler for conversation command."""
+        await handle_command_error(ctx, error)
+
 async def setup(bot):
     """Add the cog to the bot."""
     await bot.add_cog(AICommands(bot))
@@ -3,11 +3,21 @@
 Moderation commands for the Discord bot.
 """
 import discord
+from discord import app_commands
 from discord.ext import commands
 import traceback
 import sys
 import logging
+import time
+import asyncio
+import datetime
 from utils.error_handler import handle_command_error
+from utils.audit_log import AuditLog
+from utils import metrics
+from utils.periodic import periodic_scheduler
+from utils.shared_state import shared_db_path
+from utils.bulk_actions import run_bounded
+from utils.voice_index import VoiceStateIndex
 import config
 
 logger = logging.getLogger('discord_bot')
@@ -17,44 +27,302 @@ class ModerationCommands(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        # Cancellation events for running nukes, keyed by channel ID
+        self.nuke_jobs = {}
+        # Who is in which voice channel, kept up to date from voice state events
+        self.voice_index = VoiceStateIndex()
+        # Moderation actions are written to SQLite in batches, off the event loop
+        self.audit_log = None
+        if config.AUDIT_LOG_ENABLED:
+            self.audit_log = AuditLog(
+                db_path=shared_db_path('audit.db', config.AUDIT_DB_PATH) or 'audit.db',
+                batch_size=config.AUDIT_BATCH_SIZE,
+                max_queued=config.AUDIT_MAX_QUEUED
+            )
+            metrics.AUDIT_QUEUE_DEPTH.set_function(lambda: len(self.audit_log))
     
-    @commands.command(name='nuke', help="チャンネル内のすべてのメッセージを削除します。管理者権限が必要です。")
+    async def cog_load(self):
+        """Start the periodic audit log flush."""
+        if self.audit_log is not None:
+            periodic_scheduler.add('audit-flush', config.AUDIT_FLUSH_INTERVAL, self.audit_log.flush)
+    
+    async def cog_unload(self):
+        """Write out queued audit events when the cog is unloaded."""
+        if self.audit_log is not None:
+            periodic_scheduler.remove('audit-flush')
+            await self.audit_log.close()
+    
+    async def cog_before_invoke(self, ctx):
+        """Start the audit event for a command; the command fills in its details.
+
+        Read-only commands are marked with extras={'audit': False} and not recorded.
+        """
+        if ctx.command.extras.get('audit', True):
+            ctx.audit = {'started_at': time.monotonic()}
+    
+    async def cog_after_invoke(self, ctx):
+        """Queue the command's audit event with who ran it and how long it took."""
+        audit = getattr(ctx, 'audit', None)
+        if self.audit_log is None or audit is None:
+            return
+        self.audit_log.record(
+            guild_id=ctx.guild.id if ctx.guild else None,
+            channel_id=ctx.channel.id,
+            user_id=ctx.author.id,
+            user_name=str(ctx.author),
+            action=audit.get('action', ctx.command.qualified_name),
+            target=audit.get('target'),
+            count=audit.get('count'),
+            duration=time.monotonic() - audit['started_at'],
+            # Commands that return early without an outcome turned the request down
+            outcome=audit.get('outcome', 'error' if ctx.command_failed else 'rejected')
+        )
+    
+    @staticmethod
+    def annotate(ctx, **details):
+        """Set the action, target, count or outcome recorded in the command's audit event."""
+        audit = getattr(ctx, 'audit', None)
+        if audit is not None:
+            audit.update(details)
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Index the voice states of every guild once connected."""
+        for guild in self.bot.guilds:
+            self.voice_index.index_guild(guild)
+        logger.info(f"Indexed voice states: {self.voice_index.stats()}")
+    
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        """Re-index a guild whose shard reconnected; voice changes during the outage were missed."""
+        self.voice_index.index_guild(guild)
+    
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        """Index the voice states of a newly joined guild."""
+        self.voice_index.index_guild(guild)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        """Drop a guild the bot has left from the index."""
+        self.voice_index.remove_guild(guild.id)
+    
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """Apply a join, leave, move or mute change to the voice index."""
+        if not self.voice_index.is_indexed(member.guild.id):
+            self.voice_index.index_guild(member.guild)
+            return
+        channel_id = after.channel.id if after.channel else None
+        self.voice_index.update(member.guild.id, member.id, channel_id, after.mute)
+    
+    def voice_members(self, guild, channel_id):
+        """Return the members in a voice channel using the index."""
+        if not self.voice_index.is_indexed(guild.id):
+            self.voice_index.index_guild(guild)
+        members = []
+        for member_id in self.voice_index.members_in(guild.id, channel_id):
+            member = guild.get_member(member_id)
+            if member is not None:
+                members.append(member)
+        return members
+    
+    async def get_voice_channel(self, ctx, voice_channel):
+        """Return the channel to act on, defaulting to VOICE_CHANNEL_ID.
+
+        Sends an error message and returns None if the default channel is unusable.
+        """
+        if voice_channel is not None:
+            return voice_channel
+            
+        # Get the voice channel by ID
+        voice_channel = ctx.guild.get_channel(config.VOICE_CHANNEL_ID)
+        if not voice_channel:
+            await ctx.send(f"指定されたチャンネル（ID: {config.VOICE_CHANNEL_ID}）が見つかりません！")
+            return None
+            
+        if not isinstance(voice_channel, discord.VoiceChannel):
+            await ctx.send(f"指定されたチャンネル（ID: {config.VOICE_CHANNEL_ID}）はボイスチャンネルではありません！")
+            return None
+        return voice_channel
+    
+    @commands.hybrid_command(name='nuke', help="チャンネル内のすべてのメッセージを削除します。管理者権限が必要です。", extras={'defer': True})
     @commands.has_permissions(manage_messages=True)
-    async def nuke(self, ctx):
-        """Purge all messages in the current channel."""
+    @app_commands.default_permissions(manage_messages=True)
+    @app_commands.guild_only()
+    @app_commands.describe(mode="clone でチャンネルを作り直し、cancel で実行中のnukeを中断します")
+    async def nuke(self, ctx, mode=None):
+        """Purge all messages in the current channel.
+
+        `!nuke clone` replaces the channel with a fresh copy instead, and
+        `!nuke cancel` stops a purge that is still running.
+        """
         try:
+            target = f"#{ctx.channel.name} ({ctx.channel.id})"
+            if mode == 'cancel':
+                self.annotate(ctx, action='nuke cancel', target=target)
+                cancel_event = self.nuke_jobs.get(ctx.channel.id)
+                if cancel_event is None:
+                    await ctx.send("実行中のnukeはありません。")
+                else:
+                    cancel_event.set()
+                    self.annotate(ctx, outcome='ok')
+                    await ctx.send("nukeを中断しています...")
+                return
+
+            if mode == 'clone':
+                self.annotate(ctx, action='nuke clone', target=target)
+                await self.clone_channel(ctx)
+                return
+
+            self.annotate(ctx, target=target)
+
             # Check if bot has manage_messages permission
             if not ctx.channel.permissions_for(ctx.guild.me).manage_messages:
                 await ctx.send("ボットにメッセージ管理権限がありません！")
                 return
-                
-            # Purge all messages in the channel
-            deleted = await ctx.channel.purge(limit=None)
-            await ctx.send(f"チャンネルをクリアしました！ {len(deleted)} 件のメッセージを削除。")
+
+            if ctx.channel.id in self.nuke_jobs:
+                await ctx.send("このチャンネルではすでにnukeが実行中です！中断するには `!nuke cancel` を使ってください。")
+                return
+
+            # Purge all messages in the channel, reporting progress as we go
+            cancel_event = self.nuke_jobs[ctx.channel.id] = asyncio.Event()
+            start_time = time.monotonic()
+            progress = await ctx.send("メッセージを削除しています...")
+            try:
+                deleted = await self.purge_channel(ctx.channel, progress, cancel_event)
+            finally:
+                del self.nuke_jobs[ctx.channel.id]
+            elapsed = time.monotonic() - start_time
+            self.annotate(ctx, count=deleted, outcome='cancelled' if cancel_event.is_set() else 'ok')
+
+            if cancel_event.is_set():
+                await self.update_progress(progress, f"nukeを中断しました。 {deleted} 件のメッセージを削除。（{elapsed:.1f}秒）", final=True)
+            else:
+                await self.update_progress(progress, f"チャンネルをクリアしました！ {deleted} 件のメッセージを削除。（{elapsed:.1f}秒）", final=True)
+            logger.info(f"Nuked {deleted} messages in channel {ctx.channel.id} in {elapsed:.1f}s")
         except discord.errors.Forbidden:
+            self.annotate(ctx, outcome='error')
             await ctx.send("ボットにメッセージを削除する権限がありません！")
         except Exception as e:
+            self.annotate(ctx, outcome='error')
             await handle_command_error(ctx, e, "メッセージ削除でエラーが発生しました")
     
-    @commands.command(name='言論統制', help="特定のユーザーをボイスチャンネルでミュートします。")
-    async def speech_control(self, ctx):
-        """Mute a specific user in voice channel."""
+    async def purge_channel(self, channel, progress, cancel_event):
+        """Delete every message except `progress` and return the number deleted.
+
+        Messages young enough for bulk deletion are removed 100 at a time; history
+        is newest first, so everything after the first older message is deleted
+        individually.
+        """
+        bulk_cutoff = discord.utils.utcnow() - datetime.timedelta(days=config.NUKE_BULK_DELETE_MAX_AGE_DAYS)
+        deleted = 0
+        last_update = time.monotonic()
+        batch = []
+
+        async for message in channel.history(limit=None):
+            if cancel_event.is_set():
+                break
+            if message.id == progress.id:
+                continue
+
+            if message.created_at > bulk_cutoff:
+                batch.append(message)
+                if len(batch) < 100:
+                    continue
+                await channel.delete_messages(batch)
+                deleted += len(batch)
+                batch = []
+            else:
+                if batch:
+                    await channel.delete_messages(batch)
+                    deleted += len(batch)
+                    batch = []
+                await message.delete()
+                deleted += 1
+
+            # Throttle progress edits to stay clear of the edit rate limit
+            if time.monotonic() - last_update >= config.NUKE_PROGRESS_INTERVAL:
+                await self.update_progress(progress, f"メッセージを削除しています... {deleted} 件削除済み（`!nuke cancel` で中断）")
+                last_update = time.monotonic()
+
+        if batch and not cancel_event.is_set():
+            await channel.delete_messages(batch)
+            deleted += len(batch)
+        return deleted
+    
+    async def update_progress(self, progress, content, final=False):
+        """Edit the progress message, posting `content` as a new message if a final edit fails.
+
+        For slash commands the progress message is an interaction follow-up,
+        which can no longer be edited once the interaction token expires
+        (15 minutes); a long purge carries on without progress updates.
+        """
+        try:
+            await progress.edit(content=content)
+        except discord.HTTPException as e:
+            if not final:
+                logger.warning(f"Could not update nuke progress: {str(e)}")
+                return
+            await progress.channel.send(content)
+    
+    async def clone_channel(self, ctx):
+        """Replace the current channel with an empty clone at the same position."""
+        if not ctx.channel.permissions_for(ctx.author).manage_channels:
+            await ctx.send("あなたにチャンネル管理権限がありません！")
+            return
+        if not ctx.channel.permissions_for(ctx.guild.me).manage_channels:
+            await ctx.send("ボットにチャンネル管理権限がありません！")
+            return
+
+        # clone() copies the name, topic, permission overwrites and category
+        old_channel = ctx.channel
+        new_channel = await old_channel.clone(reason=f"!nuke clone by {ctx.author}")
+        await new_channel.edit(position=old_channel.position)
+        await old_channel.delete(reason=f"!nuke clone by {ctx.author}")
+        self.annotate(ctx, outcome='ok')
+        await new_channel.send("チャンネルを作り直しました！すべてのメッセージが削除されました。")
+        logger.info(f"Replaced channel {old_channel.id} with clone {new_channel.id}")
+    
+    @commands.hybrid_command(name='言論統制', help="特定のユーザーをボイスチャンネルでミュートします。ユーザーを指定する場合はメンバーをミュートする権限が必要です。例: !言論統制 @ユーザー")
+    @app_commands.guild_only()
+    @app_commands.describe(target_user="ミュートするユーザー（省略時は既定のユーザー）")
+    async def speech_control(self, ctx, target_user: discord.Member = None):
+        """Mute a specific user (TARGET_USER_ID by default) in voice channel."""
         try:
             # Check if bot has mute_members permission
             if not ctx.guild.me.guild_permissions.mute_members:
                 await ctx.send("ボットにメンバーをミュートする権限がありません！サーバーの権限設定を確認してください。")
                 return
-                
-            # Find the user by ID
-            target_user = ctx.guild.get_member(config.TARGET_USER_ID)
-            if not target_user:
-                await ctx.send(f"指定されたユーザー（ID: {config.TARGET_USER_ID}）が見つかりません！サーバーに参加しているか確認してください。")
+
+            # Anyone may mute the default user; naming someone else needs mute_members
+            if target_user is not None and target_user.id != config.TARGET_USER_ID and not ctx.author.guild_permissions.mute_members:
+                self.annotate(ctx, target=f"{target_user} ({target_user.id})", outcome='rejected')
+                await ctx.send("あなたにメンバーをミュートする権限がありません！")
                 return
                 
+            # Find the default user by ID (only voice-connected members are cached)
+            if target_user is None:
+                target_user = ctx.guild.get_member(config.TARGET_USER_ID)
+                if not target_user:
+                    try:
+                        target_user = await ctx.guild.fetch_member(config.TARGET_USER_ID)
+                    except discord.NotFound:
+                        target_user = None
+                if not target_user:
+                    await ctx.send(f"指定されたユーザー（ID: {config.TARGET_USER_ID}）が見つかりません！サーバーに参加しているか確認してください。")
+                    return
+                
             # Check if user is in a voice channel
-            if not target_user.voice or not target_user.voice.channel:
+            if not self.voice_index.is_indexed(ctx.guild.id):
+                self.voice_index.index_guild(ctx.guild)
+            if self.voice_index.channel_of(ctx.guild.id, target_user.id) is None:
                 await ctx.send(f"ユーザー {target_user.name} はボイスチャンネルに接続していません！")
                 return
+            if self.voice_index.is_muted(ctx.guild.id, target_user.id):
+                await ctx.send(f"ユーザー {target_user.name} はすでにミュートされています！")
+                return
                 
             # Check role hierarchy
             if ctx.guild.me.top_role <= target_user.top_role:
@@ -63,80 +331,145 @@ class ModerationCommands(commands.Cog):
                 
             # Mute the user
             await target_user.edit(mute=True)
+            self.annotate(ctx, target=f"{target_user} ({target_user.id})", count=1, outcome='ok')
             await ctx.send(f"ユーザー {target_user.name} をスピーカーミュートしました！")
         except Exception as e:
+            self.annotate(ctx, outcome='error')
             await handle_command_error(ctx, e, "ミュート処理でエラーが発生しました")
     
-    @commands.command(name='暑くないわ', help="ボイスチャンネル内のすべてのユーザーをミュートします。管理者権限が必要です。")
+    @commands.hybrid_command(name='暑くないわ', help="ボイスチャンネル内のすべてのユーザーをミュートします。管理者権限が必要です。例: !暑くないわ #チャンネル", extras={'defer': True})
     @commands.has_permissions(administrator=True)
-    async def mute_all(self, ctx):
-        """Mute all users in a specific voice channel."""
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.describe(voice_channel="ミュートするボイスチャンネル（省略時は既定のチャンネル）")
+    async def mute_all(self, ctx, voice_channel: discord.VoiceChannel = None):
+        """Mute all users in a voice channel (VOICE_CHANNEL_ID by default)."""
         try:
             # Check if bot has mute_members permission
             if not ctx.guild.me.guild_permissions.mute_members:
                 await ctx.send("ボットにメンバーをミュートする権限がありません！サーバーの権限設定を確認してください。")
                 return
                 
-            # Get the voice channel by ID
-            voice_channel = ctx.guild.get_channel(config.VOICE_CHANNEL_ID)
-            if not voice_channel:
-                await ctx.send(f"指定されたチャンネル（ID: {config.VOICE_CHANNEL_ID}）が見つかりません！")
-                return
-                
-            if not isinstance(voice_channel, discord.VoiceChannel):
-                await ctx.send(f"指定されたチャンネル（ID: {config.VOICE_CHANNEL_ID}）はボイスチャンネルではありません！")
+            voice_channel = await self.get_voice_channel(ctx, voice_channel)
+            if voice_channel is None:
                 return
                 
             # Check if there are members in the voice channel
-            if not voice_channel.members:
+            members = self.voice_members(ctx.guild, voice_channel.id)
+            if not members:
                 await ctx.send("ボイスチャンネルに誰も接続していません！")
                 return
                 
-            # Mute all members in the voice channel
-            for member in voice_channel.members:
-                # Check role hierarchy
-                if ctx.guild.me.top_role <= member.top_role:
-                    await ctx.send(f"ボットのロールが {member.name} のロール以下です！ボットのロールを上位に設定してください。")
-                    continue
-                await member.edit(mute=True)
+            # Check role hierarchy, then mute the remaining members concurrently
+            targets = [member for member in members if ctx.guild.me.top_role > member.top_role]
+            skipped = [member for member in members if ctx.guild.me.top_role <= member.top_role]
+            summary, changed, failed = await self.set_voice_mute(targets, mute=True, skipped=skipped)
+            self.annotate(ctx, target=f"{voice_channel.name} ({voice_channel.id})", count=changed, outcome='partial' if failed else 'ok')
                 
-            await ctx.send(f"ボイスチャンネル {voice_channel.name} まかそ軍全員突撃！")
+            await ctx.send(f"ボイスチャンネル {voice_channel.name} まかそ軍全員突撃！\n{summary}")
         except Exception as e:
+            self.annotate(ctx, outcome='error')
             await handle_command_error(ctx, e, "一括ミュート処理でエラーが発生しました")
     
-    @commands.command(name='解除', help="ボイスチャンネル内のすべてのユーザーのミュートを解除します。管理者権限が必要です。")
+    @commands.hybrid_command(name='解除', help="ボイスチャンネル内のすべてのユーザーのミュートを解除します。管理者権限が必要です。例: !解除 #チャンネル", extras={'defer': True})
     @commands.has_permissions(administrator=True)
-    async def unmute_all(self, ctx):
-        """Unmute all users in a specific voice channel."""
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.describe(voice_channel="ミュートを解除するボイスチャンネル（省略時は既定のチャンネル）")
+    async def unmute_all(self, ctx, voice_channel: discord.VoiceChannel = None):
+        """Unmute all users in a voice channel (VOICE_CHANNEL_ID by default)."""
         try:
             # Check if bot has mute_members permission
             if not ctx.guild.me.guild_permissions.mute_members:
                 await ctx.send("ボットにメンバーをミュートする権限がありません！サーバーの権限設定を確認してください。")
                 return
                 
-            # Get the voice channel by ID
-            voice_channel = ctx.guild.get_channel(config.VOICE_CHANNEL_ID)
-            if not voice_channel:
-                await ctx.send(f"指定されたチャンネル（ID: {config.VOICE_CHANNEL_ID}）が見つかりません！")
-                return
-                
-            if not isinstance(voice_channel, discord.VoiceChannel):
-                await ctx.send(f"指定されたチャンネル（ID: {config.VOICE_CHANNEL_ID}）はボイスチャンネルではありません！")
+            voice_channel = await self.get_voice_channel(ctx, voice_channel)
+            if voice_channel is None:
                 return
                 
             # Check if there are members in the voice channel
-            if not voice_channel.members:
+            members = self.voice_members(ctx.guild, voice_channel.id)
+            if not members:
                 await ctx.send("ボイスチャンネルに誰も接続していません！")
                 return
                 
-            # Unmute all members in the voice channel
-            for member in voice_channel.members:
-                await member.edit(mute=False)
+            # Unmute all members in the voice channel concurrently
+            summary, changed, failed = await self.set_voice_mute(members, mute=False)
+            self.annotate(ctx, target=f"{voice_channel.name} ({voice_channel.id})", count=changed, outcome='partial' if failed else 'ok')
                 
-            await ctx.send(f"ボイスチャンネル {voice_channel.name} まかそ軍全員撤退！")
+            await ctx.send(f"ボイスチャンネル {voice_channel.name} まかそ軍全員撤退！\n{summary}")
         except Exception as e:
+            self.annotate(ctx, outcome='error')
             await handle_command_error(ctx, e, "ミュート解除処理でエラーが発生しました")
     
+    async def set_voice_mute(self, members, mute, skipped=()):
+        """Server-mute or unmute members concurrently.
+
+        Returns `(summary, changed, failed)`: a summary for the channel and the
+        number of members changed and failed.
+        """
+        start_time = time.monotonic()
+        # Members already in the requested state need no API call
+        pending = [member for member in members if self.voice_index.is_muted(member.guild.id, member.id) != mute]
+        results = await run_bounded(pending, lambda member: member.edit(mute=mute), config.BULK_EDIT_CONCURRENCY)
+        failures = [(member, error) for member, error in results if error is not None]
+        elapsed = time.monotonic() - start_time
+
+        lines = [
+            f"成功: {len(pending) - len(failures)}人 / 変更不要: {len(members) - len(pending)}人 / "
+            f"失敗: {len(failures)}人 / スキップ: {len(skipped)}人（{elapsed:.2f}秒）"
+        ]
+        if skipped:
+            lines.append(f"ボットのロールが以下のメンバーのロール以下のためスキップしました: {self.format_names(skipped)}")
+        if failures:
+            details = [f"{member.name} ({str(error)[:50]})" for member, error in failures]
+            lines.append(f"失敗したメンバー: {self.format_names(details, limit=10)}")
+        logger.info(f"Set mute={mute} for {len(pending)} members in {elapsed:.2f}s ({len(failures)} failed, {len(skipped)} skipped)")
+        return "\n".join(lines), len(pending) - len(failures), len(failures)
+
+    @staticmethod
+    def format_names(items, limit=20):
+        """Join member names (or strings) for a message, truncating long lists."""
+        names = [item if isinstance(item, str) else item.name for item in items]
+        text = ", ".join(names[:limit])
+        if len(names) > limit:
+            text += f" 他{len(names) - limit}人"
+        return text
+
+    @commands.hybrid_command(name='audit', aliases=['監査'], help="最近のモデレーション操作の履歴を表示します。例: !audit 2", extras={'audit': False})
+    @commands.guild_only()
+    @commands.has_permissions(view_audit_log=True)
+    @app_commands.default_permissions(view_audit_log=True)
+    @app_commands.guild_only()
+    @app_commands.describe(page="ページ番号（1が最新）")
+    async def audit(self, ctx, page: int = 1):
+        """Page through this guild's recent moderation actions, newest first."""
+        if self.audit_log is None:
+            await ctx.send("監査ログ機能は無効になっています。")
+            return
+
+        page_size = config.AUDIT_PAGE_SIZE
+        page = max(page, 1)
+        events, total = await self.audit_log.recent(ctx.guild.id, page_size, (page - 1) * page_size)
+        if not events:
+            await ctx.send("このページにはモデレーション履歴がありません。")
+            return
+
+        embed = discord.Embed(title="📜 モデレーション履歴", color=0xe74c3c)
+        for event in events:
+            details = [f"<t:{int(event['created_at'])}:f>", f"実行者: <@{event['user_id']}>"]
+            if event['target']:
+                details.append(f"対象: {event['target']}")
+            if event['count'] is not None:
+                details.append(f"件数: {event['count']}")
+            if event['duration'] is not None:
+                details.append(f"所要: {event['duration']:.2f}秒")
+            embed.add_field(name=f"{event['action']}（{event['outcome']}）", value=" / ".join(details), inline=False)
+        pages = (total + page_size - 1) // page_size
+        embed.set_footer(text=f"ページ {page}/{pages}（全{total}件）")
+        await ctx.send(embed=embed)
+
     # Error handlers
     @nuke.error
     async def nuke_error(self, ctx, error):
@@ -167,6 +500,14 @@ class ModerationCommands(commands.Cog):
         else:
             await handle_command_error(ctx, error)
 
+    @audit.error
+    async def audit_error(self, ctx, error):
+        """Error handler for audit command."""
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.send("あなたに監査ログの表示権限がありません！")
+        else:
+            await handle_command_error(ctx, error)
+
 async def setup(bot):
     """Add the cog to the bot."""
     await bot.add_cog(ModerationCommands(bot))
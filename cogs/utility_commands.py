@@ -6,9 +6,12 @@ import discord
 from discord.ext import commands
 import logging
 import time
+import math
 import datetime
 import pytz
-import asyncio
+from utils import metrics
+from utils.periodic import periodic_scheduler
+import config
 
 logger = logging.getLogger('discord_bot')
 
@@ -18,61 +21,44 @@ class UtilityCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.japan_tz = pytz.timezone('Asia/Tokyo')
-        # Flag to track if the status update task is running
-        self.status_updating = False
-        # Start the background task for updating status with current time
-        self.start_status_task()
+        self.last_status = None  # Status text currently shown, to skip no-op presence updates
+        
+    async def cog_load(self):
+        """Update the status clock at the start of every minute."""
+        periodic_scheduler.add('presence', config.PRESENCE_UPDATE_INTERVAL, self.update_status)
+        logger.info("Started status update job")
         
     def cog_unload(self):
         """Cleanup when cog is unloaded."""
-        self.status_updating = False
-        if hasattr(self, 'status_task') and not self.status_task.done():
-            self.status_task.cancel()
-            
-    def start_status_task(self):
-        """Create and start the status update task."""
-        if not self.status_updating:
-            self.status_updating = True
-            # Create a new task for updating status
-            self.status_task = self.bot.loop.create_task(self.update_status())
-            logger.info("Started status update task")
+        periodic_scheduler.remove('presence')
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Show the time right after (re)connecting; a new session starts without a presence."""
+        self.last_status = None
+        await self.update_status()
         
     async def update_status(self):
-        """Update the bot's status with the current time in Japan."""
-        await self.bot.wait_until_ready()
-        logger.info("Status update task is running")
-        
-        update_interval = 30  # Update every 30 seconds as requested
-        last_minute = -1  # Track last minute to reduce logging
-        
-        while not self.bot.is_closed() and self.status_updating:
-            try:
-                # Get the current time in Japan
-                now = datetime.datetime.now(self.japan_tz)
-                current_minute = now.minute
-                
-                # Use a simple time format without seconds to avoid rate limits
-                time_str = now.strftime('🕒 %H:%M JST')
-                
-                # Create and set the activity
-                activity = discord.Activity(
-                    type=discord.ActivityType.watching, 
-                    name=time_str
-                )
-                await self.bot.change_presence(activity=activity)
-                
-                # Only log when minute changes to reduce console spam
-                if current_minute != last_minute:
-                    logger.info(f"Updated status to: {time_str}")
-                    last_minute = current_minute
-                
-            except Exception as e:
-                logger.error(f"Error updating status: {str(e)}")
-            
-            # Wait before updating again
-            await asyncio.sleep(update_interval)
+        """Update the bot's status with the current time in Japan, if it changed."""
+        if not self.bot.is_ready():
+            return
+        
+        # Use a simple time format without seconds to avoid rate limits
+        time_str = datetime.datetime.now(self.japan_tz).strftime('🕒 %H:%M JST')
+        if time_str == self.last_status:
+            metrics.PRESENCE_UPDATES.inc(result='skipped')
+            return
+        
+        activity = discord.Activity(
+            type=discord.ActivityType.watching, 
+            name=time_str
+        )
+        await self.bot.change_presence(activity=activity)
+        self.last_status = time_str
+        metrics.PRESENCE_UPDATES.inc(result='sent')
+        logger.info(f"Updated status to: {time_str}")
     
-    @commands.command(name='ping', help="ボットの応答時間を確認します。")
+    @commands.hybrid_command(name='ping', help="ボットの応答時間を確認します。")
     async def ping(self, ctx):
         """Check the bot's latency."""
         # Calculate the time it takes to send a message
@@ -95,12 +81,67 @@ class UtilityCommands(commands.Cog):
         embed.add_field(name="メッセージ応答時間", value=f"{response_time}ms", inline=True)
         embed.add_field(name="WebSocket接続時間", value=f"{websocket_latency}ms", inline=True)
         
+        # Per-shard latency when the bot is sharded
+        if isinstance(self.bot, commands.AutoShardedBot):
+            if ctx.guild is not None:
+                embed.add_field(name="このサーバーのシャード", value=str(ctx.guild.shard_id), inline=True)
+            shard_lines = []
+            for shard_id, latency in sorted(self.bot.latencies):
+                shard = self.bot.get_shard(shard_id)
+                state = "切断" if shard is None or shard.is_closed() else "接続中"
+                latency_text = f"{round(latency * 1000)}ms" if math.isfinite(latency) else "-"
+                shard_lines.append(f"#{shard_id}: {latency_text} ({state})")
+            embed.add_field(
+                name=f"シャード ({len(shard_lines)}/{self.bot.shard_count})",
+                value="\n".join(shard_lines[:20]) or "なし",
+                inline=False
+            )
+        
         # Edit the original message with the embed
         await message.edit(content=None, embed=embed)
         
         logger.info(f"Ping command used. Response time: {response_time}ms, WebSocket latency: {websocket_latency}ms")
         
-    @commands.command(name='time', aliases=['時間'], help="日本の現在時刻を表示します。")
+    @commands.hybrid_command(name='memory', aliases=['メモリ'], help="ボットのメモリ使用量とキャッシュの状況を表示します。")
+    async def memory_report(self, ctx):
+        """Report resident memory and the size of the bot's caches."""
+        rss_mb = metrics.resident_memory_bytes() / (1024 * 1024)
+        cached_members = sum(len(guild.members) for guild in self.bot.guilds)
+        voice_members = sum(len(channel.members) for guild in self.bot.guilds for channel in guild.voice_channels)
+        
+        embed = discord.Embed(
+            title="🧠 メモリ使用状況",
+            description="プロセスとキャッシュの状況",
+            color=0x9b59b6
+        )
+        embed.add_field(name="常駐メモリ", value=f"{rss_mb:.1f} MB", inline=True)
+        embed.add_field(name="サーバー数", value=str(len(self.bot.guilds)), inline=True)
+        embed.add_field(name="キャッシュ済みユーザー", value=str(len(self.bot.users)), inline=True)
+        embed.add_field(name="キャッシュ済みメンバー", value=f"{cached_members}（うちボイス接続中 {voice_members}）", inline=True)
+        embed.add_field(name="メッセージキャッシュ", value=f"{len(self.bot.cached_messages)} / {config.MESSAGE_CACHE_SIZE}", inline=True)
+        
+        # Caches owned by the AI commands
+        ai_cog = self.bot.get_cog('AICommands')
+        if ai_cog is not None:
+            if ai_cog.cache is not None:
+                cache_stats = ai_cog.cache.stats()
+                embed.add_field(
+                    name="Gemini応答キャッシュ",
+                    value=f"{cache_stats['entries']}件（ヒット率 {cache_stats['hit_rate']:.0%}）",
+                    inline=True
+                )
+            if ai_cog.conversations is not None:
+                conversation_stats = ai_cog.conversations.stats()
+                embed.add_field(
+                    name="会話履歴",
+                    value=f"{conversation_stats['conversations']}件（{conversation_stats['chars']}文字）",
+                    inline=True
+                )
+        
+        await ctx.send(embed=embed)
+        logger.info(f"Memory command used. RSS: {rss_mb:.1f}MB, cached members: {cached_members}")
+        
+    @commands.hybrid_command(name='time', aliases=['時間'], help="日本の現在時刻を表示します。")
     async def time_command(self, ctx):
         """Display the current time in Japan."""
         now = datetime.datetime.now(self.japan_tz)
@@ -6,11 +6,7 @@ Contains environment variable handling and bot settings.
 import os
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Logging is configured by utils.logging_setup.setup_logging (see LOG_* below)
 logger = logging.getLogger('discord_bot')
 
 # API Keys and tokens from environment variables with fallback to input
@@ -37,21 +33,144 @@ MAX_MESSAGE_LENGTH = 2000
 MAX_OUTPUT_TOKENS = 1000
 TEMPERATURE = 0.7
 
+# Command input settings (slash commands work in every mode)
+# 'content': read every message for BOT_PREFIX commands (needs the message content intent)
+# 'mention': prefix commands only as "@bot gemini ...", without the message content intent
+# 'off': slash commands only; no message events are received at all
+PREFIX_COMMAND_MODE = os.getenv('PREFIX_COMMAND_MODE', 'content')
+SYNC_APP_COMMANDS = os.getenv('SYNC_APP_COMMANDS', 'true') == 'true'  # Register slash commands with Discord on startup
+
+# Gemini client settings
+GEMINI_MAX_CONCURRENCY = 4  # Maximum number of Gemini requests in flight at once
+GEMINI_REQUEST_TIMEOUT = 60  # Seconds before a Gemini request is abandoned
+GEMINI_LAZY_IMPORT = True  # Import the Gemini SDK on the first !gemini instead of when the cog loads
+GEMINI_FALLBACK_MODEL = 'gemini-1.5-flash-8b'  # Model used when the primary one keeps failing (None disables)
+GEMINI_ATTEMPT_TIMEOUT = 20  # Seconds before a single attempt is abandoned and retried
+GEMINI_MAX_RETRIES = 2  # Retries per model for transient errors (503, 429, timeouts)
+GEMINI_RETRY_BASE_DELAY = 0.5  # Seconds; backoff doubles per retry with full jitter
+GEMINI_RETRY_MAX_DELAY = 4.0  # Upper bound for a single backoff delay
+GEMINI_HEDGE_PERCENTILE = 0.95  # Send a second request when one is slower than this latency percentile (None disables)
+GEMINI_HEDGE_MIN_SAMPLES = 20  # Latency samples needed before hedging kicks in
+GEMINI_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures before a model's circuit breaker opens
+GEMINI_BREAKER_RESET_TIMEOUT = 30  # Seconds before an open circuit breaker lets a trial request through
+
+# Sharding settings (environment variables so launcher.py can assign shards to worker processes)
+SHARDING_ENABLED = os.getenv('SHARDING_ENABLED', 'false') == 'true'  # Use AutoShardedBot
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None  # Total shards (None lets Discord recommend)
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id.strip()] or None  # Shards run by this process
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '1'))  # Processes started by launcher.py
+WORKER_INDEX = int(os.getenv('WORKER_INDEX', '0'))  # This process's index among launcher.py workers
+SHARED_STATE_DIR = os.getenv('SHARED_STATE_DIR')  # Directory for state shared between worker processes
+
+# Cache policy settings (keep resident memory flat as guild and member counts grow)
+MEMBER_CACHE_VOICE_ONLY = True  # Cache only members in voice channels; others are fetched when needed
+MESSAGE_CACHE_SIZE = 0  # Messages kept in discord.py's message cache (0 disables it)
+CHUNK_GUILDS_AT_STARTUP = False  # Request full member lists for every guild on connect
+
+# Streaming reply settings
+GEMINI_STREAMING = True  # Edit a placeholder message as the response streams in
+STREAM_EDIT_INTERVAL = 1.0  # Minimum seconds between edits of the same message
+STREAM_EDIT_MIN_CHARS = 20  # Minimum new characters before an intermediate edit
+STREAM_PLACEHOLDER = "考え中..."
+
+# Reply rendering settings (long replies use embeds, very long ones a single attachment)
+REPLY_EMBED_LIMIT = 4096  # Characters per embed description
+REPLY_EMBED_TOTAL_LIMIT = 6000  # Characters across all embeds in one message
+REPLY_ATTACHMENT_THRESHOLD = 6000  # Replies longer than this are sent as a Markdown file with a preview
+REPLY_PREVIEW_LENGTH = 1500  # Characters of preview shown with an attachment
+REPLY_EMBED_COLOR = 0x4285f4
+
+# Response cache settings
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_MAX_ENTRIES = 256  # Entries kept in memory (least recently used are evicted)
+RESPONSE_CACHE_TTL = 3600  # Seconds a cached response stays valid
+RESPONSE_CACHE_DB_PATH = os.getenv('RESPONSE_CACHE_DB_PATH')  # SQLite file for a persistent tier (disabled if unset)
+RESPONSE_CACHE_OPT_OUT_FLAG = '--nocache'  # Prefix a question with this to bypass the cache
+GEMINI_COALESCE_REQUESTS = True  # Share one upstream call between identical concurrent questions
+
+# Conversation memory settings (users opt in per channel with !会話 on)
+CONVERSATION_MEMORY_ENABLED = True
+CONVERSATION_SCOPE = 'channel'  # 'channel' shares history in a channel, 'user' keeps it per user and channel
+CONVERSATION_TOKEN_BUDGET = 2000  # Maximum tokens of history sent with each question
+CONVERSATION_IDLE_TIMEOUT = 1800  # Seconds of inactivity before a history is discarded
+CONVERSATION_MAX_TOTAL_CHARS = 500000  # Ceiling on history text held across all channels
+
+# Admission control for !gemini (token buckets per user and guild, fair queue in front of the client)
+GEMINI_USER_BURST = 3  # Requests a user can make back to back
+GEMINI_USER_REFILL_PER_MINUTE = 6  # Sustained requests per minute per user
+GEMINI_GUILD_BURST = 20  # Requests a guild can make back to back
+GEMINI_GUILD_REFILL_PER_MINUTE = 60  # Sustained requests per minute per guild
+GEMINI_QUEUE_MAX = 50  # Requests waiting for a slot before new ones are shed
+GEMINI_QUEUE_MAX_PER_USER = 3  # Requests one user may have waiting at once
+
+# Command priority settings (moderation never waits behind AI work)
+COMMAND_PRIORITY_ORDER = ('moderation', 'utility', 'ai')  # Highest priority first
+COMMAND_PRIORITY_CLASSES = {  # Cog name -> priority class
+    'ModerationCommands': 'moderation',
+    'UtilityCommands': 'utility',
+    'AICommands': 'ai'
+}
+COMMAND_DEFAULT_PRIORITY_CLASS = 'utility'  # Commands outside these cogs, e.g. !help
+COMMAND_POOL_SIZES = {  # Commands of each class running at once (None for unlimited)
+    'moderation': None,
+    'utility': 20,
+    'ai': None  # The !gemini fair queue does admission (queue positions and shedding) for AI work
+}
+OUTBOUND_REQUEST_LIMITS = {  # Discord HTTP requests in flight per class (None for unlimited)
+    'moderation': None,
+    'utility': 10,
+    'ai': 5
+}
+OUTBOUND_MAX_PRIORITY_WAIT = 1.0  # Seconds a request waits on higher classes before it is sent anyway (None waits indefinitely)
+
+# Moderation settings
+BULK_EDIT_CONCURRENCY = 5  # Member edits in flight at once during bulk mute/unmute
+NUKE_BULK_DELETE_MAX_AGE_DAYS = 13  # Messages younger than this are bulk deleted (Discord allows under 14 days)
+NUKE_PROGRESS_INTERVAL = 3.0  # Minimum seconds between !nuke progress updates
+
+# Moderation audit log settings (SQLite, written in batches off the event loop)
+AUDIT_LOG_ENABLED = True
+AUDIT_DB_PATH = os.getenv('AUDIT_DB_PATH')  # SQLite file (default: audit.db in SHARED_STATE_DIR or the working directory)
+AUDIT_FLUSH_INTERVAL = 5  # Seconds between batched writes
+AUDIT_BATCH_SIZE = 100  # Queued events that trigger a write before the next interval
+AUDIT_MAX_QUEUED = 10000  # Unwritten events kept in memory before the oldest are dropped
+AUDIT_PAGE_SIZE = 10  # Actions per page shown by !audit
+
+# Logging settings (records are written by a background thread; see utils/logging_setup.py)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_JSON = os.getenv('LOG_FORMAT', 'json') == 'json'  # One JSON object per line; LOG_FORMAT=text for plain lines
+LOG_SAMPLE_RATES = {  # Fraction of INFO records kept from high-volume loggers (and their children)
+    'discord_bot.commands': 0.1
+}
+
+# Periodic job settings (jobs run on wall-clock multiples of their interval)
+PRESENCE_UPDATE_INTERVAL = 60  # The status shows HH:MM, so update at the start of each minute
+AI_MAINTENANCE_INTERVAL = 300  # Evict expired responses, idle conversations and rate-limit buckets
+
+# Monitoring settings
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event loop lag samples for /metrics
+
 # Fixed channel and user IDs
 VOICE_CHANNEL_ID = 1350092524127125538
 TARGET_USER_ID = 860507172835033118
 
 # Gemini system prompt
 SYSTEM_PROMPT = "あなたは親しみやすい日本語アシスタントです。自然でフレンドリーに応答してください。"
+GEMINI_PREAMBLE_PATH = os.getenv('GEMINI_PREAMBLE_PATH')  # Optional file with persona/knowledge text appended to the system prompt
+GEMINI_CONTEXT_CACHE_ENABLED = True  # Store a long system instruction with Gemini context caching (needs a preamble file and a versioned GEMINI_MODEL such as 'gemini-1.5-flash-001')
+GEMINI_CONTEXT_CACHE_TTL = 3600  # Seconds the cached system instruction lives; refreshed at half this interval
 
 # Command descriptions (for help messages)
 COMMAND_DESCRIPTIONS = {
-    "gemini": "Gemini AIを使って質問に答えます。例: !gemini こんにちは",
-    "nuke": "チャンネル内のすべてのメッセージを削除します。管理者権限が必要です。",
-    "言論統制": "特定のユーザーをボイスチャンネルでミュートします。",
-    "暑くないわ": "ボイスチャンネル内のすべてのユーザーをミュートします。管理者権限が必要です。",
-    "解除": "ボイスチャンネル内のすべてのユーザーのミュートを解除します。管理者権限が必要です。",
+    "gemini": "Gemini AIを使って質問に答えます。例: !gemini こんにちは（先頭に --nocache を付けるとキャッシュを使いません）",
+    "会話": "Geminiの会話履歴を有効/無効にします。例: !会話 on / !会話 off / !会話 clear",
+    "nuke": "チャンネル内のすべてのメッセージを削除します。管理者権限が必要です。（!nuke clone でチャンネルを作り直し、!nuke cancel で中断）",
+    "言論統制": "特定のユーザーをボイスチャンネルでミュートします。ユーザーを指定する場合はメンバーをミュートする権限が必要です。例: !言論統制 @ユーザー（省略時は既定のユーザー）",
+    "暑くないわ": "ボイスチャンネル内のすべてのユーザーをミュートします。管理者権限が必要です。例: !暑くないわ #チャンネル（省略時は既定のチャンネル）",
+    "解除": "ボイスチャンネル内のすべてのユーザーのミュートを解除します。管理者権限が必要です。例: !解除 #チャンネル（省略時は既定のチャンネル）",
     "ping": "ボットの応答時間を確認します。",
+    "memory": "ボットのメモリ使用量とキャッシュの状況を表示します。",
     "time": "日本の現在時刻を表示します。(!時間でも利用可能)",
+    "audit": "最近のモデレーション操作の履歴を表示します。例: !audit 2（2ページ目）",
     "help": "利用可能なコマンドの一覧を表示します。"
 }
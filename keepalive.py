@@ -1,36 +1,75 @@
 # -*- coding: utf-8 -*-
 """
-Simple web server to keep the Discord bot alive with UptimeRobot.
-Only needed when running on Replit, not on Render.com.
+Keep-alive and health web server for the Discord bot.
+Runs on the bot's own asyncio loop using aiohttp (already a discord.py dependency).
 """
 import os
-from flask import Flask
-from threading import Thread
+import math
+import time
+import logging
+from aiohttp import web
+from utils import metrics
+from utils.periodic import periodic_scheduler
 
-app = Flask(__name__)
+logger = logging.getLogger('discord_bot')
 
-@app.route('/')
-def home():
+STARTED_AT = time.monotonic()
+
+async def home(request):
     """Home route that UptimeRobot will ping."""
-    return "Discord bot is alive!"
+    return web.Response(text="Discord bot is alive!")
 
-def run():
-    """Run the Flask app on port 8080."""
-    # Use PORT environment variable if available (for Render compatibility)
-    port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
+async def health(request):
+    """Report gateway connection state, latency and event loop lag."""
+    bot = request.app['bot']
+    latency = bot.latency
+    connected = bot.is_ready() and not bot.is_closed()
+    return web.json_response({
+        "status": "ok" if connected else "starting",
+        "connected": connected,
+        "latency_ms": round(latency * 1000) if math.isfinite(latency) else None,
+        "loop_lag_ms": round(metrics.last_event_loop_lag * 1000, 1),
+        "guilds": len(bot.guilds),
+        "uptime_seconds": round(time.monotonic() - STARTED_AT),
+        "periodic_jobs": periodic_scheduler.stats()
+    })
+
+async def ready(request):
+    """Readiness check: 200 once the bot is connected to the gateway, 503 before."""
+    bot = request.app['bot']
+    if bot.is_ready() and not bot.is_closed():
+        return web.Response(text="ready")
+    return web.Response(text="not ready", status=503)
+
+async def metrics_endpoint(request):
+    """Expose bot metrics in the Prometheus text format."""
+    return web.Response(
+        text=metrics.registry.render(),
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
 
-def keep_alive():
+async def keep_alive(bot):
     """
-    Start the server in a separate thread.
-    Skip if running on Render.com (RENDER environment variable exists)
+    Start the web server on the running event loop and return its runner.
+    Skip if running as a Render.com worker (RENDER is set and no PORT is assigned).
     """
-    # Don't start the web server if we're on Render
-    if os.environ.get('RENDER') == 'true':
-        print("Running on Render.com - web server not started")
-        return
-        
-    print("Keep alive server started!")
-    t = Thread(target=run)
-    t.daemon = True
-    t.start()
\ No newline at end of file
+    if os.environ.get('RENDER') == 'true' and 'PORT' not in os.environ:
+        logger.info("Running as a Render.com worker - web server not started")
+        return None
+
+    app = web.Application()
+    app['bot'] = bot
+    app.add_routes([
+        web.get('/', home),
+        web.get('/health', health),
+        web.get('/ready', ready),
+        web.get('/metrics', metrics_endpoint)
+    ])
+
+    # Use PORT environment variable if available (for Render compatibility)
+    port = int(os.environ.get('PORT', 8080))
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host='0.0.0.0', port=port).start()
+    logger.info(f"Keep alive server started on port {port}")
+    return runner
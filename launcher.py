@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-process launcher for large guild counts.
+Splits the bot's shards into contiguous ranges and runs each range in its own
+main.py worker process, restarting workers that crash (with backoff).
+"""
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import subprocess
+import urllib.request
+from config import get_api_key, SHARD_COUNT, WORKER_PROCESSES, LOG_LEVEL, LOG_JSON, LOG_SAMPLE_RATES
+from utils.logging_setup import setup_logging
+
+logger = logging.getLogger('discord_bot')
+
+RESTART_DELAY = 5  # Seconds to wait before restarting a crashed worker (doubled after each fast failure)
+MAX_RESTART_DELAY = 300  # Ceiling on the restart delay
+FAST_FAILURE_WINDOW = 60  # A worker exiting within this many seconds of starting counts as a fast failure
+MAX_FAST_FAILURES = 5  # Consecutive fast failures before a worker is given up on
+CONFIG_ERROR_EXIT_CODE = 2  # main.py exits with this when its token or keys are missing or rejected
+
+def fetch_recommended_shard_count(token):
+    """Ask Discord how many shards it recommends for this bot."""
+    request = urllib.request.Request(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f'Bot {token}', 'User-Agent': 'DiscordBot (launcher.py, 0.1.0)'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)['shards']
+
+def split_shards(shard_count, workers):
+    """Split shard IDs 0..shard_count-1 into at most `workers` contiguous groups."""
+    workers = max(min(workers, shard_count), 1)
+    size, extra = divmod(shard_count, workers)
+    groups = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+def worker_env(index, shard_ids, shard_count, gemini_api_key, discord_token):
+    """Build the environment for one worker process."""
+    env = dict(os.environ)
+    env.update({
+        'GEMINI_API_KEY': gemini_api_key,
+        'DISCORD_TOKEN': discord_token,
+        'SHARDING_ENABLED': 'true',
+        'SHARD_COUNT': str(shard_count),
+        'SHARD_IDS': ','.join(str(shard_id) for shard_id in shard_ids),
+        'WORKER_INDEX': str(index)
+    })
+    # Give each worker its own port for the keep-alive server
+    if 'PORT' in os.environ:
+        env['PORT'] = str(int(os.environ['PORT']) + index)
+    return env
+
+def restart_delay(fast_failures):
+    """Return the seconds to wait before restarting after `fast_failures` consecutive fast failures."""
+    return min(RESTART_DELAY * 2 ** max(fast_failures - 1, 0), MAX_RESTART_DELAY)
+
+def start_worker(index, env):
+    logger.info(f"Starting worker {index} for shards {env['SHARD_IDS']}")
+    return subprocess.Popen([sys.executable, 'main.py'], env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    """Start the workers and keep them running until interrupted."""
+    setup_logging(LOG_LEVEL, LOG_JSON, LOG_SAMPLE_RATES)
+    try:
+        gemini_api_key = get_api_key("GEMINI_API_KEY", "Enter Gemini API Key (visible input): ")
+        discord_token = get_api_key("DISCORD_TOKEN", "Enter Discord Bot Token (visible input): ")
+    except ValueError as e:
+        logger.error(f"Configuration error: {str(e)}")
+        sys.exit(1)
+
+    shard_count = SHARD_COUNT or fetch_recommended_shard_count(discord_token)
+    groups = split_shards(shard_count, WORKER_PROCESSES)
+    logger.info(f"Running {shard_count} shards across {len(groups)} worker processes")
+
+    envs = [worker_env(index, shard_ids, shard_count, gemini_api_key, discord_token) for index, shard_ids in enumerate(groups)]
+    workers = [start_worker(index, env) for index, env in enumerate(envs)]
+    started_at = [time.monotonic()] * len(workers)
+    fast_failures = [0] * len(workers)
+    restart_at = [None] * len(workers)  # When a crashed worker is due to be restarted
+    exit_code = 0
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while not stopping and any(worker is not None for worker in workers):
+            time.sleep(1)
+            now = time.monotonic()
+            for index, worker in enumerate(workers):
+                if worker is None:
+                    continue
+                if restart_at[index] is not None:
+                    if now >= restart_at[index]:
+                        restart_at[index] = None
+                        started_at[index] = now
+                        workers[index] = start_worker(index, envs[index])
+                    continue
+                code = worker.poll()
+                if code is None:
+                    continue
+                if code == 0:
+                    logger.info(f"Worker {index} exited cleanly; not restarting it")
+                    workers[index] = None
+                    continue
+                if code == CONFIG_ERROR_EXIT_CODE:
+                    # Restarting will not fix a missing or rejected token
+                    logger.error(f"Worker {index} stopped on a configuration error; not restarting it")
+                    workers[index] = None
+                    exit_code = code
+                    continue
+                if now - started_at[index] < FAST_FAILURE_WINDOW:
+                    fast_failures[index] += 1
+                else:
+                    fast_failures[index] = 1
+                if fast_failures[index] >= MAX_FAST_FAILURES:
+                    logger.error(
+                        f"Worker {index} exited with code {code} {fast_failures[index]} times within "
+                        f"{FAST_FAILURE_WINDOW}s of starting; giving up on it"
+                    )
+                    workers[index] = None
+                    exit_code = 1
+                    continue
+                delay = restart_delay(fast_failures[index])
+                logger.warning(f"Worker {index} exited with code {code}; restarting in {delay}s")
+                restart_at[index] = now + delay
+    except KeyboardInterrupt:
+        pass
+    finally:
+        running = [worker for worker in workers if worker is not None]
+        for worker in running:
+            if worker.poll() is None:
+                worker.terminate()
+        for worker in running:
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
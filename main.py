@@ -3,23 +3,38 @@
 Discord bot with Gemini AI integration and moderation capabilities.
 This bot provides Japanese language assistance and voice channel management functions.
 """
+import time
+STARTED_AT = time.perf_counter()
+
 import discord
 from discord.ext import commands
-import google.generativeai as genai
 import asyncio
-import traceback
 import sys
 import logging
 import os
-from config import get_api_key, BOT_PREFIX, COMMAND_DESCRIPTIONS
+from config import (
+    get_api_key, BOT_PREFIX, COMMAND_DESCRIPTIONS, PREFIX_COMMAND_MODE, SYNC_APP_COMMANDS, WORKER_INDEX, LOOP_LAG_INTERVAL,
+    SHARDING_ENABLED, SHARD_COUNT, SHARD_IDS,
+    MEMBER_CACHE_VOICE_ONLY, MESSAGE_CACHE_SIZE, CHUNK_GUILDS_AT_STARTUP,
+    COMMAND_PRIORITY_ORDER, COMMAND_PRIORITY_CLASSES, COMMAND_DEFAULT_PRIORITY_CLASS, COMMAND_POOL_SIZES,
+    OUTBOUND_REQUEST_LIMITS, OUTBOUND_MAX_PRIORITY_WAIT, LOG_LEVEL, LOG_JSON, LOG_SAMPLE_RATES
+)
 from keepalive import keep_alive
+from utils import metrics
+from utils import gemini_client
+from utils.startup import StartupTimer
+from utils.logging_setup import setup_logging, log_context
+from utils.periodic import periodic_scheduler
+from utils.scheduler import CommandScheduler, PriorityGate, install_outbound_priority
+
+# The Gemini SDK is not imported here; utils.gemini_client loads it on first use
+startup = StartupTimer(STARTED_AT)
+startup.mark("imports")
 
-# Setup logging
+# Setup logging (records are written by a background thread, off the event loop)
+setup_logging(LOG_LEVEL, LOG_JSON, LOG_SAMPLE_RATES)
 logger = logging.getLogger('discord_bot')
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+command_logger = logging.getLogger('discord_bot.commands')
 
 # Get API keys
 try:
@@ -27,29 +42,75 @@ try:
     DISCORD_TOKEN = get_api_key("DISCORD_TOKEN", "Enter Discord Bot Token (visible input): ")
 
     # Configure Gemini API
-    genai.configure(api_key=GEMINI_API_KEY)
+    gemini_client.configure(GEMINI_API_KEY)
 except ValueError as e:
     logger.error(f"Configuration error: {str(e)}")
-    sys.exit(1)
+    sys.exit(2)  # launcher.py does not restart workers on configuration errors
+startup.mark("config")
 
 # Discord bot setup
 intents = discord.Intents.default()
-intents.message_content = True
+intents.message_content = PREFIX_COMMAND_MODE == 'content'
 intents.voice_states = True  # Enable voice state intents for mute
-bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents, help_command=None)
+if PREFIX_COMMAND_MODE == 'off':
+    # Slash commands arrive as interactions, so message events are not needed at all
+    intents.guild_messages = False
+    intents.dm_messages = False
+command_prefix = BOT_PREFIX if PREFIX_COMMAND_MODE == 'content' else commands.when_mentioned
+bot_options = {
+    'max_messages': MESSAGE_CACHE_SIZE or None,
+    'chunk_guilds_at_startup': CHUNK_GUILDS_AT_STARTUP
+}
+if MEMBER_CACHE_VOICE_ONLY:
+    bot_options['member_cache_flags'] = discord.MemberCacheFlags.none()
+    bot_options['member_cache_flags'].voice = True
+if SHARDING_ENABLED:
+    # AutoShardedBot runs several shards (all, or SHARD_IDS) on this process's loop
+    if SHARD_COUNT:
+        bot_options['shard_count'] = SHARD_COUNT
+    if SHARD_IDS:
+        bot_options['shard_ids'] = SHARD_IDS
+    bot = commands.AutoShardedBot(command_prefix=command_prefix, intents=intents, help_command=None, **bot_options)
+else:
+    bot = commands.Bot(command_prefix=command_prefix, intents=intents, help_command=None, **bot_options)
+metrics.GATEWAY_LATENCY.set_function(lambda: bot.latency)
+
+# Priority classes: each has its own command pool, and Discord requests are sent highest class first
+scheduler = CommandScheduler(COMMAND_PRIORITY_CLASSES, COMMAND_DEFAULT_PRIORITY_CLASS, COMMAND_POOL_SIZES)
+install_outbound_priority(bot.http, PriorityGate(COMMAND_PRIORITY_ORDER, OUTBOUND_REQUEST_LIMITS, OUTBOUND_MAX_PRIORITY_WAIT))
+app_commands_synced = False
 
 @bot.event
 async def on_ready():
     """Called when the bot has connected to Discord."""
     logger.info(f'{bot.user} has connected to Discord!')
     print(f'{bot.user} has connected to Discord!')
+    if not startup.reported:
+        startup.mark("gateway connect")
+        startup.report()
+    await sync_app_commands()
+
+async def sync_app_commands():
+    """Register the slash commands with Discord once per run.
+
+    Commands are global, so only the first launcher.py worker syncs them.
+    """
+    global app_commands_synced
+    if app_commands_synced or not SYNC_APP_COMMANDS or WORKER_INDEX != 0:
+        return
+    app_commands_synced = True
+    try:
+        synced = await bot.tree.sync()
+        logger.info(f"Synced {len(synced)} application commands")
+    except discord.HTTPException as e:
+        logger.error(f"Failed to sync application commands: {str(e)}")
 
-@bot.command(name='help')
+@bot.hybrid_command(name='help', help="利用可能なコマンドの一覧を表示します。")
 async def custom_help(ctx, command_name=None):
     """Display help information for commands."""
     embed = discord.Embed(
         title="ボットコマンド一覧",
-        description="利用可能なコマンドの一覧です。`!<コマンド名>`で実行できます。",
+        description="利用可能なコマンドの一覧です。`!<コマンド名>`で実行できます。すべてのコマンドは `/` のスラッシュコマンドでも使えます。",
         color=0x3498db
     )
     
@@ -58,45 +119,91 @@ async def custom_help(ctx, command_name=None):
         
     await ctx.send(embed=embed)
 
+@bot.before_invoke
+async def before_any_command(ctx):
+    """Record when a command starts, defer slow slash commands, then wait for the command's priority pool."""
+    ctx.command_started_at = time.perf_counter()
+    metrics.COMMAND_INVOCATIONS.inc(command=ctx.command.qualified_name)
+    if ctx.interaction is not None and ctx.command.extras.get('defer'):
+        # Acknowledge slow slash commands before any waiting; the reply arrives as a follow-up
+        await ctx.defer()
+    await scheduler.acquire(ctx)
+
+@bot.after_invoke
+async def after_any_command(ctx):
+    """Free the command's slot in its priority pool."""
+    scheduler.release(ctx)
+
+@bot.event
+async def on_command_completion(ctx):
+    """Record the latency of a successful command."""
+    latency = record_command_latency(ctx)
+    command_logger.info(f"Command {ctx.command} completed", extra=log_context(ctx, latency=latency))
+
+def record_command_latency(ctx):
+    """Observe the time since the command started for the invoked command and return it."""
+    started_at = getattr(ctx, 'command_started_at', None)
+    if started_at is None or ctx.command is None:
+        return None
+    latency = time.perf_counter() - started_at
+    metrics.COMMAND_LATENCY.observe(latency, command=ctx.command.qualified_name)
+    return latency
+
 @bot.event
 async def on_command_error(ctx, error):
     """Global error handler for command errors."""
     if isinstance(error, commands.CommandNotFound):
         return  # Silently ignore command not found errors
+
+    latency = record_command_latency(ctx)
+    # Commands with their own error handler count errors in handle_command_error
+    if not ctx.command.has_error_handler():
+        metrics.COMMAND_ERRORS.inc(command=ctx.command.qualified_name, error=type(error).__name__)
         
     if isinstance(error, commands.MissingRequiredArgument):
         await ctx.send(f"引数が不足しています: {error.param.name}")
         return
         
-    logger.error(f"Command error: {str(error)}")
+    logger.error(
+        f"Command error: {str(error)}",
+        extra=log_context(ctx, latency=latency, error=type(error).__name__)
+    )
     await ctx.send(f"エラーが発生しました: {str(error)}")
 
+EXTENSIONS = ("cogs.ai_commands", "cogs.moderation_commands", "cogs.utility_commands")
+
 async def load_extensions():
     """Load all extensions (cogs)."""
-    await bot.load_extension("cogs.ai_commands")
-    await bot.load_extension("cogs.moderation_commands")
-    await bot.load_extension("cogs.utility_commands")
+    for extension in EXTENSIONS:
+        await bot.load_extension(extension)
     logger.info("Loaded all extensions")
 
 async def main():
     """Main function to start the bot."""
     async with bot:
         await load_extensions()
-        await bot.start(DISCORD_TOKEN)
+        startup.mark("extensions")
+        # Start the keep alive web server on the bot's event loop
+        web_runner = await keep_alive(bot)
+        startup.mark("web server")
+        lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag(LOOP_LAG_INTERVAL))
+        try:
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            lag_monitor.cancel()
+            periodic_scheduler.stop()
+            if web_runner is not None:
+                await web_runner.cleanup()
 
 # Run the bot
 if __name__ == "__main__":
     try:
-        # Start the keep alive web server
-        keep_alive()
-        print("Keep alive server started!")
-        # Then start the bot
         asyncio.run(main())
     except discord.errors.LoginFailure as e:
         print("無効なDiscordトークンです。Developer Portalで新しいトークンを生成してください。")
-        logger.error(f"Login failure: {str(e)}")
-        traceback.print_exc(file=sys.stdout)
+        logger.error(f"Login failure: {str(e)}", exc_info=True)
+        sys.exit(2)
     except Exception as e:
         print("ボットの実行中に予期しないエラーが発生しました:")
-        logger.error(f"Unexpected error: {str(e)}")
-        traceback.print_exc(file=sys.stdout)
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Admission control for upstream calls: token-bucket rate limits and a fair queue.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger('discord_bot')
+
+class QueueFullError(Exception):
+    """Raised when the queue is full and a request is shed."""
+
+class RateLimiter:
+    """Token buckets keyed by user or guild ID.
+
+    Each key may spend up to `capacity` requests in a burst; tokens refill
+    at `refill_per_second`. Full buckets carry no state and are pruned.
+    """
+
+    PRUNE_THRESHOLD = 10000  # Buckets tracked before idle ones are pruned
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._buckets = {}  # key -> (tokens, updated_at)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def retry_after(self, key):
+        """Return 0 if `key` has a token available, else the seconds until it will."""
+        tokens = self._tokens(key, time.monotonic())
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.refill_per_second
+
+    def consume(self, key):
+        """Spend one token for `key`. Call only after retry_after() returned 0."""
+        now = time.monotonic()
+        self._buckets[key] = (self._tokens(key, now) - 1, now)
+        if len(self._buckets) > self.PRUNE_THRESHOLD:
+            self.prune()
+
+    def prune(self):
+        """Forget buckets that have refilled completely."""
+        now = time.monotonic()
+        full = [key for key in self._buckets if self._tokens(key, now) >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+        return len(full)
+
+    def _tokens(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        tokens, updated_at = bucket
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+class FairQueue:
+    """Run at most `concurrency` jobs at once and dispatch waiting jobs round-robin by user.
+
+    A user with many queued requests gets one turn per round, so a burst from
+    one user cannot starve everyone else. At most `max_queued` jobs wait in
+    total and at most `max_queued_per_user` per user; beyond that requests are shed.
+    """
+
+    def __init__(self, concurrency, max_queued, max_queued_per_user):
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.running = 0
+        self.shed = 0
+        self._waiting = OrderedDict()  # user_id -> deque of futures, in round-robin order
+        self._queued = 0
+
+    def __len__(self):
+        return self._queued
+
+    async def run(self, user_id, func, on_queued=None):
+        """Run `func()` once a slot is free and return its result.
+
+        If the job has to wait, `await on_queued(position)` is called with its
+        1-based position in the dispatch order. Raises QueueFullError when shed.
+        """
+        if self.running < self.concurrency and not self._queued:
+            self.running += 1
+        else:
+            await self._wait_turn(user_id, on_queued)
+        try:
+            return await func()
+        finally:
+            self.running -= 1
+            self._dispatch()
+
+    async def _wait_turn(self, user_id, on_queued):
+        waiters = self._waiting.get(user_id)
+        if self._queued >= self.max_queued or (waiters and len(waiters) >= self.max_queued_per_user):
+            self.shed += 1
+            raise QueueFullError("The request queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(future)
+        self._queued += 1
+        try:
+            if on_queued is not None:
+                await on_queued(self.position(user_id, future))
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Our turn came just as we were cancelled; hand the slot on
+                self.running -= 1
+                self._dispatch()
+            else:
+                self._remove(user_id, future)
+            raise
+
+    def position(self, user_id, future):
+        """Return the 1-based dispatch position of a waiting job."""
+        waiters = self._waiting.get(user_id)
+        if not waiters or future not in waiters:
+            return 0
+        rounds = waiters.index(future)
+        position = rounds + 1
+        ahead = True
+        for other, other_waiters in self._waiting.items():
+            if other == user_id:
+                ahead = False
+                continue
+            # Users earlier in the rotation are served once more in our round
+            position += min(len(other_waiters), rounds + 1 if ahead else rounds)
+        return position
+
+    def _dispatch(self):
+        while self.running < self.concurrency and self._waiting:
+            user_id, waiters = next(iter(self._waiting.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            if future.done():
+                # Cancelled while waiting; its task is about to clean up
+                continue
+            self.running += 1
+            future.set_result(None)
+
+    def _remove(self, user_id, future):
+        waiters = self._waiting.get(user_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiting[user_id]
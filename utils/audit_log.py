@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Audit log of moderation actions.
+Events are queued in memory and written to SQLite in batches on a worker
+thread, so recording an action never waits for disk I/O.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils import metrics
+
+logger = logging.getLogger('discord_bot')
+
+COLUMNS = ('created_at', 'guild_id', 'channel_id', 'user_id', 'user_name', 'action', 'target', 'count', 'duration', 'outcome')
+
+class AuditLog:
+    """Write-behind store of moderation actions.
+
+    `record()` only appends to an in-memory queue. Queued events are written
+    when `flush()` is called (periodically by the owner) or as soon as
+    `batch_size` of them are waiting. At most `max_queued` unwritten events
+    are kept; beyond that the oldest are dropped.
+    """
+
+    def __init__(self, db_path, batch_size, max_queued):
+        self.batch_size = batch_size
+        self.max_queued = max_queued
+        self.written = 0
+        self.dropped = 0
+        self._pending = deque()
+        self._flush_task = None
+        self._dropping = False  # Warn once per overflow until a flush succeeds
+        # A single worker thread serializes all access to the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audit-log')
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL lets several shard processes share the file without blocking readers
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS moderation_actions ("
+            "id INTEGER PRIMARY KEY, created_at REAL NOT NULL, guild_id INTEGER, channel_id INTEGER, "
+            "user_id INTEGER, user_name TEXT, action TEXT NOT NULL, target TEXT, count INTEGER, "
+            "duration REAL, outcome TEXT)"
+        )
+        # Queries page through one guild's actions, newest first
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS moderation_actions_guild_time ON moderation_actions (guild_id, created_at)"
+        )
+        self._db.commit()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, **event):
+        """Queue an event; keys are the names in COLUMNS (created_at defaults to now)."""
+        event.setdefault('created_at', time.time())
+        self._queue([tuple(event.get(column) for column in COLUMNS)])
+        if len(self._pending) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Write every queued event and return how many were written."""
+        if not self._pending or self._db is None:
+            return 0
+        rows = list(self._pending)
+        self._pending.clear()
+        start_time = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self._db_insert, rows)
+        except sqlite3.Error as e:
+            logger.error(f"Audit log database error: {str(e)}")
+            # Put the batch back in front of anything queued meanwhile
+            pending = list(self._pending)
+            self._pending.clear()
+            self._queue(rows + pending)
+            return 0
+        metrics.AUDIT_FLUSH_LATENCY.observe(time.perf_counter() - start_time)
+        metrics.AUDIT_EVENTS.inc(len(rows), result='written')
+        self.written += len(rows)
+        self._dropping = False
+        return len(rows)
+
+    async def recent(self, guild_id, limit, offset=0):
+        """Return `(events, total)`: a page of a guild's events, newest first, and its event count."""
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        try:
+            rows, total = await loop.run_in_executor(self._executor, self._db_recent, guild_id, limit, offset)
+        except sqlite3.Error as e:
+            logger.error(f"Audit log database error: {str(e)}")
+            return [], 0
+        return [dict(zip(COLUMNS, row)) for row in rows], total
+
+    async def close(self):
+        """Write any queued events and close the database."""
+        if self._db is None:
+            return
+        await self.flush()
+        self._executor.submit(self._db.close)
+        self._executor.shutdown(wait=True)
+        self._db = None
+
+    def _queue(self, rows):
+        self._pending.extend(rows)
+        overflow = len(self._pending) - self.max_queued
+        if overflow > 0:
+            for _ in range(overflow):
+                self._pending.popleft()
+            self.dropped += overflow
+            metrics.AUDIT_EVENTS.inc(overflow, result='dropped')
+            if not self._dropping:
+                self._dropping = True
+                logger.warning("Audit log queue full; dropping the oldest events until a write succeeds")
+
+    def _db_insert(self, rows):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        self._db.executemany(
+            f"INSERT INTO moderation_actions ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows
+        )
+        self._db.commit()
+
+    def _db_recent(self, guild_id, limit, offset):
+        rows = self._db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM moderation_actions WHERE guild_id = ? "
+            "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (guild_id, limit, offset)
+        ).fetchall()
+        total = self._db.execute(
+            "SELECT COUNT(*) FROM moderation_actions WHERE guild_id = ?", (guild_id,)
+        ).fetchone()[0]
+        return rows, total
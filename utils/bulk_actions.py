@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for running many Discord API calls concurrently.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger('discord_bot')
+
+async def run_bounded(items, action, concurrency):
+    """Run `action(item)` for every item with at most `concurrency` calls in flight.
+
+    discord.py already queues requests per rate-limit bucket; the bound keeps
+    a large batch from piling up behind a single bucket. Returns a list of
+    `(item, error)` pairs where `error` is None on success.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item):
+        async with semaphore:
+            try:
+                await action(item)
+            except Exception as e:
+                logger.warning(f"Bulk action failed for {item}: {str(e)}")
+                return item, e
+            return item, None
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in conversation memory for the AI commands.
+Keeps a token-budgeted sliding window of recent turns per channel or per user.
+"""
+import time
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger('discord_bot')
+
+class Conversation:
+    """Recent turns of one conversation, stored as (role, text, tokens) tuples."""
+
+    __slots__ = ('turns', 'tokens', 'chars', 'last_used')
+
+    def __init__(self):
+        self.turns = deque()
+        self.tokens = 0
+        self.chars = 0
+        self.last_used = time.monotonic()
+
+    def append(self, role, text, tokens):
+        self.turns.append((role, text, tokens))
+        self.tokens += tokens
+        self.chars += len(text)
+
+    def pop_oldest(self):
+        role, text, tokens = self.turns.popleft()
+        self.tokens -= tokens
+        self.chars -= len(text)
+
+    def contents(self):
+        """Return the turns in Gemini `contents` format."""
+        return [{"role": role, "parts": [text]} for role, text, _ in self.turns]
+
+class ConversationStore:
+    """Conversation histories for every opted-in channel or user.
+
+    Each history is trimmed to `token_budget` tokens, dropped after `idle_timeout`
+    seconds without use, and the least recently used histories are evicted when
+    the total text held across all of them exceeds `max_total_chars`.
+    """
+
+    def __init__(self, token_budget, idle_timeout, max_total_chars):
+        self.token_budget = token_budget
+        self.idle_timeout = idle_timeout
+        self.max_total_chars = max_total_chars
+        self.enabled = set()
+        self._conversations = OrderedDict()
+        self._total_chars = 0
+
+    def is_enabled(self, key):
+        return key in self.enabled
+
+    def enable(self, key):
+        self.enabled.add(key)
+
+    def disable(self, key):
+        self.enabled.discard(key)
+        self.clear(key)
+
+    def clear(self, key):
+        conversation = self._conversations.pop(key, None)
+        if conversation is not None:
+            self._total_chars -= conversation.chars
+
+    def history(self, key):
+        """Return the stored turns for `key` in Gemini `contents` format."""
+        self.evict_idle()
+        conversation = self._conversations.get(key)
+        if conversation is None:
+            return []
+        return conversation.contents()
+
+    def add_exchange(self, key, user_text, user_tokens, model_text, model_tokens):
+        """Record a user message and the model's reply, then enforce the limits."""
+        conversation = self._conversations.get(key)
+        if conversation is None:
+            conversation = self._conversations[key] = Conversation()
+        self._conversations.move_to_end(key)
+        conversation.last_used = time.monotonic()
+
+        before = conversation.chars
+        conversation.append("user", user_text, user_tokens)
+        conversation.append("model", model_text, model_tokens)
+        # Drop whole exchanges so the history always starts with a user turn
+        while conversation.tokens > self.token_budget and conversation.turns:
+            conversation.pop_oldest()
+            conversation.pop_oldest()
+        self._total_chars += conversation.chars - before
+
+        while self._total_chars > self.max_total_chars and self._conversations:
+            oldest_key = next(iter(self._conversations))
+            logger.info(f"Evicting conversation {oldest_key} to stay under the memory ceiling")
+            self.clear(oldest_key)
+
+    def evict_idle(self):
+        """Drop conversations that have not been used within the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [key for key, conversation in self._conversations.items() if conversation.last_used < cutoff]
+        for key in idle:
+            self.clear(key)
+        return len(idle)
+
+    def stats(self):
+        """Return the number of stored conversations and their total size."""
+        return {
+            "conversations": len(self._conversations),
+            "enabled": len(self.enabled),
+            "chars": self._total_chars,
+            "tokens": sum(conversation.tokens for conversation in self._conversations.values())
+        }
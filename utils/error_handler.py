@@ -2,10 +2,10 @@
 """
 Error handling utilities for the Discord bot.
 """
-import traceback
-import sys
 import logging
 from discord.ext import commands
+from utils import metrics
+from utils.logging_setup import log_context
 
 logger = logging.getLogger('discord_bot')
 
@@ -26,9 +26,13 @@ async def handle_command_error(ctx, error, error_message="エラーが発生し
         return
     
     # Generic error handling
+    metrics.COMMAND_ERRORS.inc(command=ctx.command.qualified_name if ctx.command else 'unknown', error=type(error).__name__)
     full_error = f"{error_message}: {str(error)}"
     await ctx.send(full_error)
     
     # Log the full traceback
-    logger.error(f"Command error in {ctx.command}: {str(error)}")
-    traceback.print_exception(type(error), error, error.__traceback__, file=sys.stdout)
+    logger.error(
+        f"Command error in {ctx.command}: {str(error)}",
+        exc_info=error,
+        extra=log_context(ctx, error=type(error).__name__)
+    )
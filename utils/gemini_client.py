@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous Gemini client used by the AI commands.
+Keeps upstream calls off the event loop and bounds how many run at once.
+Requests get an overall deadline, retries with jittered backoff on transient
+errors, optional hedging, fallback to a second model and per-model circuit breakers.
+The system prompt is bound to the model as a system instruction, and a long one
+can be stored once upstream with Gemini context caching.
+The Gemini SDK (and its grpc/protobuf dependencies) is imported on first use.
+"""
+import asyncio
+import datetime
+import logging
+import re
+import time
+from utils import metrics
+from utils.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, backoff_delay, is_transient
+
+logger = logging.getLogger('discord_bot')
+
+_genai = None
+_api_key = None
+
+def configure(api_key):
+    """Set the Gemini API key without importing the SDK."""
+    global _api_key
+    _api_key = api_key
+    if _genai is not None:
+        _genai.configure(api_key=api_key)
+
+def load_sdk():
+    """Import and configure google.generativeai, once."""
+    global _genai
+    if _genai is None:
+        start_time = time.perf_counter()
+        import google.generativeai as genai
+        if _api_key is not None:
+            genai.configure(api_key=_api_key)
+        _genai = genai
+        logger.info(f"Imported Gemini SDK in {time.perf_counter() - start_time:.2f}s")
+    return _genai
+
+def _chunk_text(chunk):
+    """Return the text of a response chunk, or "" for chunks without text parts."""
+    try:
+        return chunk.text
+    except ValueError:
+        # e.g. the final finish-reason chunk
+        return ""
+
+def _raise_if_cancelling():
+    """Re-raise a cancellation of the current task that asyncio.wait_for swallowed.
+
+    Before Python 3.12, wait_for can return the result instead of raising when
+    the cancel arrives just as the awaited call completes.
+    """
+    task = asyncio.current_task()
+    cancelling = getattr(task, 'cancelling', None)  # Python 3.11+
+    if cancelling is not None and cancelling():
+        raise asyncio.CancelledError()
+
+# Context caching only accepts explicit model versions such as gemini-1.5-flash-001
+VERSIONED_MODEL = re.compile(r'-\d{3}$')
+
+class ContextCache:
+    """A system instruction stored upstream with Gemini context caching.
+
+    Requests to a model built from the cache are billed for the cached tokens
+    at the reduced cached rate instead of resending them. The cache expires
+    after `ttl` seconds unless `refresh()` extends it. Gemini only caches
+    content above a minimum size and only for versioned model names.
+    """
+
+    def __init__(self, model_name, system_instruction, ttl):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.cached_content = None
+        self.token_count = 0
+
+    async def create_model(self):
+        """Create the cached content and return a model that uses it."""
+        loop = asyncio.get_running_loop()
+        genai = await loop.run_in_executor(None, load_sdk)
+        self.cached_content = await loop.run_in_executor(None, lambda: genai.caching.CachedContent.create(
+            model=self.model_name,
+            display_name='discord-bot-system-instruction',
+            system_instruction=self.system_instruction,
+            ttl=datetime.timedelta(seconds=self.ttl)
+        ))
+        self.token_count = self.cached_content.usage_metadata.total_token_count
+        logger.info(f"Created Gemini context cache {self.cached_content.name} ({self.token_count} tokens)")
+        return genai.GenerativeModel.from_cached_content(self.cached_content)
+
+    async def refresh(self):
+        """Extend the cache's expiry by another `ttl` seconds."""
+        if self.cached_content is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.cached_content.update(ttl=datetime.timedelta(seconds=self.ttl))
+        )
+
+class GeminiClient:
+    """Async wrapper around one or more Gemini models with a concurrency cap and timeouts.
+
+    `timeout` is the overall deadline for a request; each attempt is limited to
+    `attempt_timeout`. Transient errors are retried up to `max_retries` times per
+    model before falling back to `fallback_model_name`. If `hedge_percentile` is
+    set, a non-streamed request slower than that percentile of recent latencies
+    gets a second, hedged request and the first answer wins.
+
+    `system_instruction` is bound to every model. With `context_cache_ttl`,
+    the primary model reads it from a Gemini context cache instead, falling
+    back to sending it with each request if the cache cannot be created.
+    """
+
+    def __init__(self, model_name, max_concurrency, timeout, attempt_timeout=None, fallback_model_name=None,
+                 max_retries=0, retry_base_delay=0.5, retry_max_delay=4.0, hedge_percentile=None,
+                 hedge_min_samples=20, breaker_failure_threshold=5, breaker_reset_timeout=30,
+                 system_instruction=None, context_cache_ttl=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.context_cache = None
+        if system_instruction and context_cache_ttl:
+            if VERSIONED_MODEL.search(model_name):
+                self.context_cache = ContextCache(model_name, system_instruction, context_cache_ttl)
+            else:
+                logger.warning(
+                    f"Gemini context caching needs a versioned model name (e.g. {model_name}-001), "
+                    f"not {model_name}; sending the system instruction with each request"
+                )
+        self.token_model = None  # Model without the system instruction, for counting tokens
+        self.model_names = [model_name] + ([fallback_model_name] if fallback_model_name else [])
+        self.models = {}
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout or timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breakers = {
+            name: CircuitBreaker(f"gemini:{name}", breaker_failure_threshold, breaker_reset_timeout)
+            for name in self.model_names
+        }
+        self.latencies = {name: LatencyTracker() for name in self.model_names}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # One lock per model, so creating the primary's context cache never holds up the fallback
+        self._load_locks = {name: asyncio.Lock() for name in self.model_names}
+
+    async def load(self, model_name=None):
+        """Create a model, importing the SDK in a worker thread if needed."""
+        model_name = model_name or self.model_name
+        async with self._load_locks.setdefault(model_name, asyncio.Lock()):
+            if model_name not in self.models:
+                genai = await asyncio.get_running_loop().run_in_executor(None, load_sdk)
+                model = None
+                if model_name == self.model_name and self.context_cache is not None:
+                    try:
+                        model = await asyncio.wait_for(self.context_cache.create_model(), timeout=self.attempt_timeout)
+                    except Exception as e:
+                        # Includes a create that outlived attempt_timeout (the worker thread may still finish it)
+                        logger.warning(f"Gemini context caching unavailable, sending the system instruction instead: {e!r}")
+                        self.context_cache = None
+                if model is None:
+                    model = genai.GenerativeModel(model_name, system_instruction=self.system_instruction)
+                self.models[model_name] = model
+        return self.models[model_name]
+
+    async def refresh_context_cache(self):
+        """Keep the context cache alive; rebuild the model on the next request if it expired."""
+        if self.context_cache is None or self.model_name not in self.models:
+            return
+        try:
+            await asyncio.wait_for(self.context_cache.refresh(), timeout=self.attempt_timeout)
+        except Exception as e:
+            logger.warning(f"Could not refresh the Gemini context cache, recreating it: {str(e)}")
+            self.models.pop(self.model_name, None)
+
+    async def generate(self, contents, generation_config, on_usage=None):
+        """Generate a completion and return its text.
+
+        `on_usage`, if given, is called with the response's usage metadata.
+        Raises asyncio.TimeoutError if the overall deadline passes, and
+        CircuitOpenError if every model's circuit breaker is open.
+        """
+        response = await self._call_with_resilience(
+            lambda model_name, timeout: self._hedged(
+                model_name,
+                lambda: self._generate_once(model_name, contents, generation_config, timeout),
+                timeout
+            )
+        )
+        metrics.record_usage(response)
+        if on_usage is not None:
+            on_usage(getattr(response, 'usage_metadata', None))
+        return response.text
+
+    async def count_tokens(self, contents):
+        """Return the number of tokens Gemini counts for `contents` alone."""
+        if self.token_model is None:
+            genai = await asyncio.get_running_loop().run_in_executor(None, load_sdk)
+            self.token_model = genai.GenerativeModel(self.model_name)
+        # Token counting is an upstream call too, so it shares the concurrency cap
+        async with self._semaphore:
+            response = await asyncio.wait_for(self.token_model.count_tokens_async(contents), timeout=self.attempt_timeout)
+        return response.total_tokens
+
+    async def stream(self, contents, generation_config, on_usage=None):
+        """Yield completion text incrementally as Gemini produces it.
+
+        Retries, fallback and the circuit breakers apply until the first chunk
+        arrives; the rest of the stream must finish within the overall deadline.
+        `on_usage`, if given, is called with the usage metadata once the stream ends.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        model_name, chunks, chunk, start_time = await self._call_with_resilience(
+            lambda model_name, timeout: self._open_stream(model_name, contents, generation_config, timeout)
+        )
+        # _open_stream returns holding a concurrency slot, released below
+        outcome = 'error'
+        try:
+            if chunks is not None:
+                yield _chunk_text(chunk)
+            while chunks is not None:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                _raise_if_cancelling()
+                text = _chunk_text(chunk)
+                if text:
+                    yield text
+            outcome = 'ok'
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            raise
+        finally:
+            self._semaphore.release()
+            metrics.GEMINI_REQUESTS.inc(mode='stream', model=model_name, outcome=outcome)
+            metrics.GEMINI_LATENCY.observe(time.perf_counter() - start_time, mode='stream')
+        # The last chunk carries the usage metadata for the whole response
+        if chunk is not None:
+            metrics.record_usage(chunk)
+            if on_usage is not None:
+                on_usage(getattr(chunk, 'usage_metadata', None))
+
+    async def _call_with_resilience(self, call):
+        """Run `call(model_name, timeout)` with retries, fallback and circuit breakers."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        last_error = None
+        for index, model_name in enumerate(self.model_names):
+            breaker = self.breakers[model_name]
+            for attempt in range(self.max_retries + 1):
+                if not breaker.allow():
+                    break
+                if index > 0 and attempt == 0:
+                    logger.warning(f"Falling back to Gemini model {model_name}")
+                    metrics.GEMINI_FALLBACKS.inc(model=model_name)
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    breaker.cancel_trial()
+                    raise asyncio.TimeoutError()
+                try:
+                    result = await call(model_name, min(self.attempt_timeout, remaining))
+                except asyncio.CancelledError:
+                    breaker.cancel_trial()
+                    raise
+                except Exception as e:
+                    if not is_transient(e):
+                        # The upstream answered; the request itself was rejected
+                        self._record_outcome(model_name, success=True)
+                        raise
+                    self._record_outcome(model_name, success=False)
+                    last_error = e
+                    logger.warning(f"Gemini {model_name} attempt {attempt + 1} failed: {type(e).__name__}: {str(e)}")
+                    if attempt < self.max_retries:
+                        metrics.GEMINI_RETRIES.inc(model=model_name)
+                        delay = backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+                        await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+                    continue
+                self._record_outcome(model_name, success=True)
+                return result
+
+        if last_error is None:
+            raise CircuitOpenError("All Gemini models are temporarily unavailable")
+        raise last_error
+
+    def _record_outcome(self, model_name, success):
+        breaker = self.breakers[model_name]
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        metrics.GEMINI_CIRCUIT_OPEN.set(1 if breaker.state == CircuitBreaker.OPEN else 0, model=model_name)
+
+    async def _hedged(self, model_name, make_call, timeout):
+        """Await `make_call()`, starting a second copy if the first is slower than usual."""
+        tracker = self.latencies[model_name]
+        threshold = None
+        if self.hedge_percentile and len(tracker) >= self.hedge_min_samples:
+            threshold = tracker.percentile(self.hedge_percentile)
+        if threshold is None or threshold >= timeout:
+            return await make_call()
+
+        tasks = [asyncio.ensure_future(make_call())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            # Only hedge when a concurrency slot is free, so hedges never queue behind real work
+            if not done and not self._semaphore.locked():
+                logger.info(f"Hedging Gemini request after {threshold:.2f}s")
+                metrics.GEMINI_HEDGES.inc(model=model_name)
+                tasks.append(asyncio.ensure_future(make_call()))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _generate_once(self, model_name, contents, generation_config, timeout):
+        """Make a single non-streamed request to one model."""
+        model = self.models.get(model_name) or await self.load(model_name)
+        async with self._semaphore:
+            start_time = time.perf_counter()
+            outcome = 'error'
+            try:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(contents, generation_config=generation_config),
+                    timeout=timeout
+                )
+                outcome = 'ok'
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+                raise
+            finally:
+                elapsed = time.perf_counter() - start_time
+                metrics.GEMINI_REQUESTS.inc(mode='generate', model=model_name, outcome=outcome)
+                metrics.GEMINI_LATENCY.observe(elapsed, mode='generate')
+        self.latencies[model_name].record(elapsed)
+        return response
+
+    async def _open_stream(self, model_name, contents, generation_config, timeout):
+        """Start a streamed request and wait for its first text chunk.
+
+        Returns `(model_name, chunks, last_chunk, start_time)` while holding a
+        concurrency slot; `chunks` is None if the stream ended without text.
+        """
+        model = self.models.get(model_name) or await self.load(model_name)
+        loop = asyncio.get_running_loop()
+        await self._semaphore.acquire()
+        start_time = time.perf_counter()
+        deadline = loop.time() + timeout
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(contents, generation_config=generation_config, stream=True),
+                timeout=timeout
+            )
+            chunks = response.__aiter__()
+            chunk = None
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    return model_name, None, chunk, start_time
+                if _chunk_text(chunk):
+                    metrics.GEMINI_FIRST_CHUNK_LATENCY.observe(time.perf_counter() - start_time)
+                    return model_name, chunks, chunk, start_time
+        except BaseException as e:
+            self._semaphore.release()
+            outcome = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'error'
+            metrics.GEMINI_REQUESTS.inc(mode='stream', model=model_name, outcome=outcome)
+            metrics.GEMINI_LATENCY.observe(time.perf_counter() - start_time, mode='stream')
+            raise
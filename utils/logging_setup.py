@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Queue-based logging pipeline.
+Records are handed to a background thread that formats and writes them,
+so log I/O never runs on the event loop thread.
+"""
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Extra record attributes emitted as top-level JSON fields
+STRUCTURED_FIELDS = ('command', 'guild', 'user', 'latency', 'error')
+
+def log_context(ctx, **fields):
+    """Return `extra` fields describing a command invocation."""
+    context = {
+        'command': ctx.command.qualified_name if ctx.command else None,
+        'guild': ctx.guild.id if ctx.guild else None,
+        'user': ctx.author.id if ctx.author else None
+    }
+    context.update(fields)
+    return context
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['traceback'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO and DEBUG records from high-volume loggers.
+
+    `rates` maps a logger name to the fraction of its records to keep; child
+    loggers inherit their parent's rate. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition('.')[0]
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the writer thread.
+
+    The stock handler formats the whole record, traceback included, into the
+    message; here only the message is rendered and the traceback is kept
+    separately so the JSON formatter can emit it as its own field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Render now; traceback objects keep whole frames alive in the queue
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging(level='INFO', json_format=True, sample_rates=None):
+    """Route all logging through a queue to a background writer thread.
+
+    Returns the started QueueListener; it is stopped (flushing the queue) at exit.
+    """
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(sample_rates or {}))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
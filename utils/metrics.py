@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal Prometheus-style metrics for the Discord bot.
+Metrics are rendered in the Prometheus text exposition format by the keep-alive server.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('discord_bot')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    ]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+class Metric:
+    """Base class holding one value per label combination."""
+
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def totals(self):
+        """Return the current values keyed by their first label (for reports)."""
+        with self._lock:
+            return {key[0] if key else '': value for key, value in self._values.items()}
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """Read the (unlabelled) value from `function` whenever metrics are rendered."""
+        self._function = function
+
+    def render(self):
+        if self._function is not None:
+            try:
+                self.set(self._function())
+            except Exception as e:
+                logger.error(f"Error reading gauge {self.name}: {str(e)}")
+        return super().render()
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed bucket boundaries."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = [(key, dict(state, counts=list(state["counts"]))) for key, state in self._values.items()]
+        for key, state in items:
+            for bound, count in zip(self.buckets, state["counts"]):
+                labels = _format_labels(self.labelnames, key, [("le", bound)])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Command metrics
+COMMAND_INVOCATIONS = Counter('discord_command_invocations_total', 'Commands invoked', ['command'])
+COMMAND_ERRORS = Counter('discord_command_errors_total', 'Commands that raised an error', ['command', 'error'])
+COMMAND_LATENCY = Histogram('discord_command_duration_seconds', 'Time from invocation to completion', ['command'])
+COMMAND_POOL_WAIT = Histogram('discord_command_pool_wait_seconds', 'Time a command waited for a slot in its priority pool', ['priority_class'])
+
+# Gemini metrics
+GEMINI_REQUESTS = Counter('gemini_requests_total', 'Upstream Gemini requests', ['mode', 'model', 'outcome'])
+GEMINI_RETRIES = Counter('gemini_retries_total', 'Gemini requests retried after a transient error', ['model'])
+GEMINI_HEDGES = Counter('gemini_hedged_requests_total', 'Hedged second requests started for slow Gemini calls', ['model'])
+GEMINI_FALLBACKS = Counter('gemini_fallbacks_total', 'Requests that fell back to another Gemini model', ['model'])
+GEMINI_CIRCUIT_OPEN = Gauge('gemini_circuit_open', 'Whether the circuit breaker for a Gemini model is open', ['model'])
+GEMINI_LATENCY = Histogram('gemini_request_duration_seconds', 'Upstream Gemini request latency', ['mode'])
+GEMINI_FIRST_CHUNK_LATENCY = Histogram('gemini_first_chunk_seconds', 'Time until the first streamed Gemini chunk')
+GEMINI_TOKENS = Counter('gemini_tokens_total', 'Tokens reported by Gemini usage metadata', ['type'])
+GEMINI_CACHED_TOKENS = Histogram(
+    'gemini_cached_prompt_tokens',
+    'Prompt tokens per request read from the Gemini context cache',
+    buckets=(0, 256, 1024, 4096, 16384, 32768, 65536, 131072)
+)
+CACHE_LOOKUPS = Counter('gemini_cache_lookups_total', 'Response cache lookups', ['result'])
+GEMINI_ADMISSIONS = Counter('gemini_admissions_total', 'Admission decisions for !gemini requests', ['result'])
+GEMINI_QUEUE_DEPTH = Gauge('gemini_queue_depth', 'Gemini requests waiting for a slot')
+
+# Moderation audit log metrics
+AUDIT_EVENTS = Counter('moderation_audit_events_total', 'Moderation audit events written or dropped', ['result'])
+AUDIT_FLUSH_LATENCY = Histogram('moderation_audit_flush_seconds', 'Time to write one batch of audit events')
+AUDIT_QUEUE_DEPTH = Gauge('moderation_audit_queue_depth', 'Audit events waiting to be written')
+
+# Runtime metrics
+GATEWAY_LATENCY = Gauge('discord_gateway_latency_seconds', 'Discord gateway heartbeat latency')
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'Delay between when a loop callback was due and when it ran',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+PERIODIC_DRIFT = Histogram(
+    'periodic_job_drift_seconds',
+    'Delay between a periodic job\'s scheduled time and when it started',
+    ['job'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+PERIODIC_MISSED = Counter('periodic_job_missed_total', 'Periodic job runs skipped because a previous run overran', ['job'])
+PRESENCE_UPDATES = Counter('discord_presence_updates_total', 'Status clock updates sent or skipped as unchanged', ['result'])
+
+PROCESS_MEMORY = Gauge('process_resident_memory_bytes', 'Resident memory size of the bot process')
+
+def resident_memory_bytes():
+    """Return the current resident set size, or the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+PROCESS_MEMORY.set_function(resident_memory_bytes)
+
+# Most recent event loop lag sample, in seconds (reported by /health)
+last_event_loop_lag = 0.0
+
+def record_usage(response):
+    """Count prompt and output tokens from a Gemini response's usage metadata."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    GEMINI_TOKENS.inc(getattr(usage, 'prompt_token_count', 0) or 0, type='prompt')
+    GEMINI_TOKENS.inc(getattr(usage, 'candidates_token_count', 0) or 0, type='output')
+    # Prompt tokens served from the context cache instead of being sent again
+    cached = getattr(usage, 'cached_content_token_count', 0) or 0
+    GEMINI_TOKENS.inc(cached, type='cached')
+    GEMINI_CACHED_TOKENS.observe(cached)
+
+async def monitor_event_loop_lag(interval):
+    """Measure how late the event loop wakes up from a sleep of `interval` seconds."""
+    global last_event_loop_lag
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        last_event_loop_lag = max(time.perf_counter() - start - interval, 0)
+        EVENT_LOOP_LAG.observe(last_event_loop_lag)
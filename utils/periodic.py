@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Shared scheduler for periodic background jobs.
+Jobs run on wall-clock boundaries (e.g. at the start of every minute) rather
+than after fixed sleeps, and the scheduler records how late each run started
+and how many runs were skipped because the previous one overran.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from utils import metrics
+
+logger = logging.getLogger('discord_bot')
+
+class PeriodicJob:
+    """A function run every `interval` seconds, aligned to multiples of the interval.
+
+    With `offset`, runs happen `offset` seconds after each boundary.
+    """
+
+    def __init__(self, name, interval, func, offset=0.0):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.offset = offset
+        self.runs = 0
+        self.missed = 0
+        self.failures = 0
+        self.last_drift = 0.0
+        self.task = None
+
+    def next_boundary(self, now):
+        """Return the first aligned run time after `now`."""
+        return (((now - self.offset) // self.interval) + 1) * self.interval + self.offset
+
+    async def run(self):
+        next_run = self.next_boundary(time.time())
+        while True:
+            await asyncio.sleep(max(next_run - time.time(), 0))
+            self.last_drift = time.time() - next_run
+            metrics.PERIODIC_DRIFT.observe(self.last_drift, job=self.name)
+            try:
+                result = self.func()
+                if inspect.isawaitable(result):
+                    await result
+                self.runs += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Periodic job {self.name} failed: {str(e)}", exc_info=True)
+
+            next_run += self.interval
+            now = time.time()
+            if next_run <= now:
+                # The run overran one or more boundaries; skip them instead of bursting
+                missed = int((now - next_run) // self.interval) + 1
+                self.missed += missed
+                metrics.PERIODIC_MISSED.inc(missed, job=self.name)
+                logger.warning(f"Periodic job {self.name} missed {missed} run(s)")
+                next_run += missed * self.interval
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "missed": self.missed,
+            "failures": self.failures,
+            "last_drift": self.last_drift
+        }
+
+class PeriodicScheduler:
+    """Registry of periodic jobs sharing one place for start, stop and stats."""
+
+    def __init__(self):
+        self._jobs = {}
+
+    def add(self, name, interval, func, offset=0.0):
+        """Start running `func` (sync or async) every `interval` seconds, replacing any job named `name`."""
+        self.remove(name)
+        job = PeriodicJob(name, interval, func, offset)
+        job.task = asyncio.get_running_loop().create_task(job.run())
+        self._jobs[name] = job
+        return job
+
+    def remove(self, name):
+        """Stop and forget a job, if it exists."""
+        job = self._jobs.pop(name, None)
+        if job is not None and job.task is not None:
+            job.task.cancel()
+
+    def stop(self):
+        """Stop every job."""
+        for name in list(self._jobs):
+            self.remove(name)
+
+    def stats(self):
+        return {name: job.stats() for name, job in self._jobs.items()}
+
+# Jobs registered by the cogs and main.py
+periodic_scheduler = PeriodicScheduler()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering of long AI replies into as few Discord messages as possible.
+Text is split on paragraph, line and sentence boundaries, code fences are
+closed and reopened across chunks, and long replies go into embeds or a
+single text attachment instead of many plain messages.
+"""
+import io
+import re
+import logging
+import discord
+
+logger = logging.getLogger('discord_bot')
+
+FENCE = "```"
+FENCE_LINE = re.compile(r'^[ \t]*```(\S*)', re.MULTILINE)
+
+# Preferred split points, best first
+SEPARATORS = ("\n\n", "\n", "。", "！", "？", ". ", "! ", "? ", "、", " ")
+
+def open_fence(text):
+    """Return the info string of a code fence left open at the end of `text`, or None."""
+    language = None
+    for match in FENCE_LINE.finditer(text):
+        language = match.group(1) if language is None else None
+    return language
+
+def balance(text):
+    """Close a code fence left open at the end of `text`."""
+    if open_fence(text) is None:
+        return text
+    return text + ("" if text.endswith("\n") else "\n") + FENCE
+
+def _cut_point(text, limit):
+    window = text[:limit]
+    for separator in SEPARATORS:
+        index = window.rfind(separator)
+        # Ignore split points that would leave a tiny chunk
+        if index >= limit // 2:
+            return index + len(separator)
+    return limit
+
+def take_chunk(text, limit):
+    """Split `text` into `(head, rest)` with `head` at most `limit` characters.
+
+    A code fence open at the split is closed in `head` and reopened, with the
+    same language, at the start of `rest`.
+    """
+    if len(text) <= limit:
+        return text, ""
+    # Leave room for the closing fence
+    cut = _cut_point(text, limit - len(FENCE) - 1)
+    head, rest = text[:cut], text[cut:]
+    language = open_fence(head)
+    if language is None:
+        return head.rstrip(), rest.lstrip("\n")
+    if not head.endswith("\n"):
+        head += "\n"
+    return head + FENCE, f"{FENCE}{language}\n" + rest.lstrip("\n")
+
+def split_markdown(text, limit):
+    """Split `text` into chunks of at most `limit` characters on natural boundaries."""
+    chunks = []
+    while text:
+        head, text = take_chunk(text, limit)
+        if head:
+            chunks.append(head)
+    return chunks
+
+def message_payload(text, message_limit, color):
+    """Return send/edit kwargs showing `text` as plain content, or as an embed if it is too long."""
+    if len(text) <= message_limit:
+        return {"content": text, "embed": None}
+    return {"content": None, "embed": discord.Embed(description=text, color=color)}
+
+def render_reply(text, message_limit, embed_limit, embed_total_limit, attachment_threshold, preview_length, color):
+    """Return the kwargs for each `ctx.send` needed to deliver `text`.
+
+    Short replies are one plain message. Longer ones are packed into embeds
+    (up to 10 per message and `embed_total_limit` characters in total).
+    Replies longer than `attachment_threshold` are sent as one message with a
+    preview and the full text as a Markdown attachment.
+    """
+    if len(text) <= message_limit:
+        return [{"content": text}]
+
+    if len(text) > attachment_threshold:
+        preview, _ = take_chunk(text, preview_length)
+        attachment = discord.File(io.BytesIO(text.encode('utf-8')), filename="reply.md")
+        return [{"content": f"{preview}\n…\n（全文は添付ファイルをご覧ください）", "file": attachment}]
+
+    payloads = []
+    embeds = []
+    total = 0
+    for chunk in split_markdown(text, embed_limit):
+        if embeds and (len(embeds) == 10 or total + len(chunk) > embed_total_limit):
+            payloads.append({"embeds": embeds})
+            embeds, total = [], 0
+        embeds.append(discord.Embed(description=chunk, color=color))
+        total += len(chunk)
+    if embeds:
+        payloads.append({"embeds": embeds})
+    return payloads
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Resilience helpers for upstream API calls: circuit breaker, latency tracking and backoff.
+"""
+import random
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger('discord_bot')
+
+# Upstream errors worth retrying (google.api_core exception names, matched without importing it)
+TRANSIENT_ERRORS = {
+    'ServiceUnavailable', 'InternalServerError', 'TooManyRequests', 'ResourceExhausted',
+    'DeadlineExceeded', 'Aborted', 'GatewayTimeout', 'TimeoutError', 'ClientConnectionError'
+}
+
+class CircuitOpenError(Exception):
+    """Raised when every upstream is failing and calls are rejected without trying."""
+
+def is_transient(error):
+    """Return True if `error` looks like a temporary upstream failure."""
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+class CircuitBreaker:
+    """Stop calling an upstream after repeated failures, then probe it again.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls for `reset_timeout` seconds. It then lets a single trial
+    call through: success closes it again, failure reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self):
+        """Return True if a call may be attempted now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def cancel_trial(self):
+        """Give up a granted call without an outcome, e.g. when it was cancelled."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker {self.name} opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+class LatencyTracker:
+    """Rolling window of recent latencies for percentile estimates."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Nearest-rank percentile of the window, or None if it is empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Response cache for Gemini completions.
+An in-memory LRU/TTL tier with an optional SQLite tier that survives restarts.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('discord_bot')
+
+def normalize_prompt(text):
+    """Normalize prompt text so trivially different questions share a cache entry."""
+    text = unicodedata.normalize('NFKC', text)
+    return ' '.join(text.split()).lower()
+
+def make_cache_key(prompt, **settings):
+    """Build a cache key from the normalized prompt and the generation settings."""
+    payload = json.dumps(
+        {"prompt": normalize_prompt(prompt), "settings": settings},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """LRU cache with per-entry TTL and an optional SQLite-backed second tier."""
+
+    def __init__(self, max_entries, ttl, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._db = None
+        self._executor = None
+        if db_path:
+            # A single worker thread serializes all access to the connection
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='response-cache')
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            # WAL lets several shard processes share the file without blocking readers
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    async def get(self, key):
+        """Return the cached value for `key`, or None on a miss."""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self._db is not None:
+            row = await self._run_db(self._db_get, key, now)
+            if row is not None:
+                expires_at, value = row
+                self._store(key, value, expires_at)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key, value):
+        """Store `value` under `key` in every tier."""
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at)
+        if self._db is not None:
+            await self._run_db(self._db_set, key, value, expires_at)
+
+    def evict_expired(self):
+        """Drop expired entries from the memory tier."""
+        now = time.time()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """Close the SQLite tier, if any."""
+        if self._db is not None:
+            self._executor.submit(self._db.close)
+            self._executor.shutdown(wait=True)
+            self._db = None
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _run_db(self, func, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        except sqlite3.Error as e:
+            logger.error(f"Response cache database error: {str(e)}")
+            return None
+
+    def _db_get(self, key, now):
+        return self._db.execute(
+            "SELECT expires_at, value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+
+    def _db_set(self, key, value, expires_at):
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+        )
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        self._db.commit()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Priority scheduling for commands and the Discord requests they make.
+Commands belong to a priority class (moderation > utility > AI by default);
+each class has its own concurrency pool, and outbound HTTP requests from
+lower classes wait while higher classes have requests in flight.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from utils import metrics
+
+logger = logging.getLogger('discord_bot')
+
+# Priority class of the command running in the current task (None outside commands)
+current_priority_class = contextvars.ContextVar('current_priority_class', default=None)
+
+class PriorityGate:
+    """Admit outbound requests by priority class.
+
+    `order` lists classes from highest to lowest priority; `limits` maps a
+    class to its maximum requests in flight (None for unlimited). A request
+    waits while its class is at its limit or any higher class has requests
+    in flight or waiting. Requests without a class are never held back.
+
+    A request held back by higher classes for `max_wait` seconds is sent
+    anyway (still within its own class limit), so a long moderation run such
+    as a big !nuke slows lower classes down instead of stalling them.
+    """
+
+    def __init__(self, order, limits, max_wait=None):
+        self.order = tuple(order)
+        self.limits = dict(limits)
+        self.max_wait = max_wait
+        self.active = {name: 0 for name in self.order}
+        self.waiting = {name: 0 for name in self.order}
+        self._condition = None  # Created on first use so it binds to the running loop
+        self._wakers = set()
+
+    def _can_run(self, name, aged=False):
+        limit = self.limits.get(name)
+        if limit is not None and self.active[name] >= limit:
+            return False
+        if aged:
+            return True
+        for higher in self.order[:self.order.index(name)]:
+            if self.active[higher] or self.waiting[higher]:
+                return False
+        return True
+
+    async def acquire(self, name):
+        if name not in self.active:
+            return
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        loop = asyncio.get_running_loop()
+        timer = None
+        if self.max_wait is not None:
+            aged_at = loop.time() + self.max_wait
+            # Wake the waiters once this request has aged so it re-checks
+            timer = loop.call_later(self.max_wait, self._schedule_wake)
+        async with self._condition:
+            self.waiting[name] += 1
+            try:
+                await self._condition.wait_for(
+                    lambda: self._can_run(name, aged=timer is not None and loop.time() >= aged_at)
+                )
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                self.waiting[name] -= 1
+                # A higher class giving up its place may unblock lower ones
+                self._condition.notify_all()
+            self.active[name] += 1
+
+    def _schedule_wake(self):
+        task = asyncio.get_running_loop().create_task(self._wake())
+        # Keep a reference until it runs; the loop only holds weak ones
+        self._wakers.add(task)
+        task.add_done_callback(self._wakers.discard)
+
+    async def _wake(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def release(self, name):
+        if name not in self.active:
+            return
+        async with self._condition:
+            self.active[name] -= 1
+            self._condition.notify_all()
+
+def install_outbound_priority(http, gate):
+    """Route every request made through discord.py's HTTP client via `gate`.
+
+    Interaction responses and follow-ups go through discord.py's webhook
+    adapter instead, so slash command replies are not prioritised.
+    """
+    request = http.request
+
+    async def prioritized_request(*args, **kwargs):
+        name = current_priority_class.get()
+        await gate.acquire(name)
+        try:
+            return await request(*args, **kwargs)
+        finally:
+            await gate.release(name)
+
+    http.request = prioritized_request
+
+class CommandScheduler:
+    """Concurrency pools per priority class for command execution.
+
+    Call `acquire(ctx)` from the bot's before_invoke hook and `release(ctx)`
+    from its after_invoke hook.
+    """
+
+    def __init__(self, cog_classes, default_class, pool_sizes):
+        self.cog_classes = dict(cog_classes)
+        self.default_class = default_class
+        self.pool_sizes = {name: size for name, size in pool_sizes.items() if size is not None}
+        self._pools = {}  # Semaphores are created on first use so they bind to the running loop
+
+    def class_of(self, command):
+        """Return the priority class of a command, based on its cog."""
+        return self.cog_classes.get(command.cog_name, self.default_class)
+
+    async def acquire(self, ctx):
+        """Wait for a slot in the command's pool and tag the task with its class."""
+        name = self.class_of(ctx.command)
+        pool = self._pools.get(name)
+        if pool is None and name in self.pool_sizes:
+            pool = self._pools[name] = asyncio.Semaphore(self.pool_sizes[name])
+        if pool is not None:
+            start_time = time.perf_counter()
+            await pool.acquire()
+            metrics.COMMAND_POOL_WAIT.observe(time.perf_counter() - start_time, priority_class=name)
+        ctx.priority_class = name
+        current_priority_class.set(name)
+
+    def release(self, ctx):
+        """Free the slot taken by `acquire`."""
+        name = getattr(ctx, 'priority_class', None)
+        if name is None:
+            return
+        ctx.priority_class = None
+        current_priority_class.set(None)
+        pool = self._pools.get(name)
+        if pool is not None:
+            pool.release()
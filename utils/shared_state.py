@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Shared state hook for stores that should be visible to every worker process.
+"""
+import os
+import logging
+import config
+
+logger = logging.getLogger('discord_bot')
+
+def shared_db_path(name, override=None):
+    """Return the SQLite path for the store `name`.
+
+    An explicit `override` wins; otherwise the store lives in SHARED_STATE_DIR
+    so all shard processes use the same file. Returns None if neither is set.
+    """
+    if override:
+        return override
+    if config.SHARED_STATE_DIR:
+        os.makedirs(config.SHARED_STATE_DIR, exist_ok=True)
+        return os.path.join(config.SHARED_STATE_DIR, name)
+    return None
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight coalescing of identical concurrent requests.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger('discord_bot')
+
+def _cancelling():
+    """Return True if the current task itself has been asked to cancel (Python 3.11+ only)."""
+    cancelling = getattr(asyncio.current_task(), 'cancelling', None)
+    return cancelling is not None and cancelling() > 0
+
+class SingleFlight:
+    """Share one in-flight call between all concurrent callers using the same key."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func):
+        """Run `func()` once per key and return `(result, shared)`.
+
+        Callers arriving while a call for `key` is running wait for it and
+        receive the same result, or the same exception, with `shared` set to True.
+        If the running call is cancelled (e.g. its command was aborted), the
+        first waiter to notice runs its own `func()` and the others wait on that.
+        """
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            try:
+                # Shield so one waiter giving up does not cancel the shared call
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled() or _cancelling():
+                    raise
+                logger.info("Coalesced call was cancelled; retrying it for a waiting caller")
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
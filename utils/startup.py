@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Startup phase timing for the Discord bot.
+"""
+import time
+import logging
+
+logger = logging.getLogger('discord_bot')
+
+class StartupTimer:
+    """Record how long each startup phase took, measured from `started_at`."""
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.phases = []
+        self._last = started_at
+        self.reported = False
+
+    def mark(self, phase):
+        """End the current phase and name it `phase`."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self):
+        """Log the timing breakdown once."""
+        if self.reported:
+            return
+        self.reported = True
+        breakdown = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases)
+        logger.info(f"Startup timing: {breakdown} (total {self._last - self.started_at:.2f}s)")
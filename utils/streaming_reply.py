@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Progressively edited Discord replies for streamed AI output.
+"""
+import time
+import logging
+from utils.reply_renderer import FENCE, balance, message_payload, take_chunk
+
+logger = logging.getLogger('discord_bot')
+
+class StreamingReply:
+    """Show streamed text by editing a placeholder message.
+
+    Edits are coalesced so a message is edited at most once per `edit_interval`
+    seconds, and only once at least `edit_min_chars` new characters are pending.
+    Text longer than `message_length` is shown in an embed; when a message
+    reaches `max_length` it is finalized at a paragraph or sentence boundary
+    and a new one is started. Open code fences are closed in every edit.
+    """
+
+    def __init__(self, ctx, placeholder, max_length, edit_interval, edit_min_chars, message_length=None, color=None):
+        self.ctx = ctx
+        self.placeholder = placeholder
+        self.max_length = max_length
+        self.message_length = message_length or max_length
+        self.color = color
+        self.edit_interval = edit_interval
+        self.edit_min_chars = edit_min_chars
+        # Room for the fence that balance() may add when a code block is still open
+        self.budget = max_length - len(FENCE) - 1
+        self.message = None
+        self.content = ""  # Text belonging to the current message
+        self.shown = 0  # Number of characters of `content` already visible
+        self.last_edit = 0.0
+        self.total_length = 0
+
+    async def start(self):
+        """Send the placeholder message."""
+        self.message = await self.ctx.send(self.placeholder)
+
+    async def append(self, text):
+        """Add streamed text, rolling over and editing when the budget allows."""
+        self.content += text
+        self.total_length += len(text)
+
+        # Finalize full messages and continue in a new one
+        while len(self.content) > self.budget:
+            head, self.content = take_chunk(self.content, self.budget)
+            await self.message.edit(**self._payload(head))
+            self.message = await self.ctx.send(**self._payload(self.content[:self.budget]))
+            self.shown = min(len(self.content), self.budget)
+            self.last_edit = time.monotonic()
+
+        pending = len(self.content) - self.shown
+        if pending <= 0:
+            return
+        # The first chunk is shown immediately; later ones are coalesced
+        if self.shown and (pending < self.edit_min_chars or time.monotonic() - self.last_edit < self.edit_interval):
+            return
+        await self._flush()
+
+    async def finish(self, empty_text):
+        """Show any remaining text, or `empty_text` if nothing was streamed."""
+        if not self.total_length:
+            await self.message.edit(content=empty_text)
+            return
+        if len(self.content) > self.shown:
+            await self._flush()
+
+    def _payload(self, text):
+        return message_payload(balance(text), self.message_length, self.color)
+
+    async def _flush(self):
+        await self.message.edit(**self._payload(self.content))
+        self.shown = len(self.content)
+        self.last_edit = time.monotonic()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Incrementally maintained index of who is in which voice channel.
+"""
+import logging
+
+logger = logging.getLogger('discord_bot')
+
+class VoiceStateIndex:
+    """Map guild → voice channel → members and their server-mute state.
+
+    Updated from voice state events so lookups never walk guild objects.
+    """
+
+    def __init__(self):
+        self._channels = {}  # (guild_id, channel_id) -> {member_id: muted}
+        self._members = {}  # (guild_id, member_id) -> channel_id
+        self._guilds = {}  # guild_id -> set of channel_ids with members
+
+    def is_indexed(self, guild_id):
+        return guild_id in self._guilds
+
+    def index_guild(self, guild):
+        """(Re)build the index for one guild from its current voice states."""
+        self.remove_guild(guild.id)
+        self._guilds[guild.id] = set()
+        for channel in list(guild.voice_channels) + list(guild.stage_channels):
+            for member_id, state in channel.voice_states.items():
+                self.update(guild.id, member_id, channel.id, state.mute)
+
+    def remove_guild(self, guild_id):
+        """Forget everything about a guild."""
+        for channel_id in self._guilds.pop(guild_id, ()):
+            for member_id in self._channels.pop((guild_id, channel_id), {}):
+                self._members.pop((guild_id, member_id), None)
+
+    def update(self, guild_id, member_id, channel_id, muted):
+        """Record that a member is in `channel_id` (None when they left voice)."""
+        channels = self._guilds.setdefault(guild_id, set())
+        previous = self._members.pop((guild_id, member_id), None)
+        if previous is not None:
+            members = self._channels.get((guild_id, previous))
+            if members is not None:
+                members.pop(member_id, None)
+                if not members:
+                    del self._channels[(guild_id, previous)]
+                    channels.discard(previous)
+        if channel_id is not None:
+            self._members[(guild_id, member_id)] = channel_id
+            self._channels.setdefault((guild_id, channel_id), {})[member_id] = muted
+            channels.add(channel_id)
+
+    def members_in(self, guild_id, channel_id):
+        """Return `{member_id: muted}` for everyone in a voice channel."""
+        return dict(self._channels.get((guild_id, channel_id), {}))
+
+    def channel_of(self, guild_id, member_id):
+        """Return the voice channel ID a member is in, or None."""
+        return self._members.get((guild_id, member_id))
+
+    def is_muted(self, guild_id, member_id):
+        """Return whether a member is server-muted, or None if they are not in voice."""
+        channel_id = self._members.get((guild_id, member_id))
+        if channel_id is None:
+            return None
+        return self._channels[(guild_id, channel_id)][member_id]
+
+    def stats(self):
+        return {"guilds": len(self._guilds), "channels": len(self._channels), "members": len(self._members)}